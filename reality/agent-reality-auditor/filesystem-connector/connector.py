@@ -5,25 +5,216 @@ Progressive discovery of file system reality with no assumptions
 Based on proven patterns from Supabase Reality Agent
 """
 
+import asyncio
 import json
 import os
+import pickle
+import re
+import secrets
 import sys
+import fnmatch
+import functools
 import hashlib
+import heapq
 import time
 import mimetypes
+import mmap
+import stat as stat_module
 import subprocess
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Set
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
 import platform
 
+# Optional faster hashers for change detection (hash_algo="xxh3_64" / "blake3")
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# Optional in-process git access; falls back to the git CLI when missing
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+# Read size for hashing; large reads amortize per-call overhead
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Files at least this large are hashed from a read-only memory map; below it
+# the map/unmap setup costs more than the copies a read loop makes
+MMAP_HASH_THRESHOLD = 64 << 20  # 64 MiB
+
+# One reusable read buffer per thread for hashing
+_hash_buffers = threading.local()
+
+
+def _get_hash_buffer() -> memoryview:
+    """Return this thread's preallocated hashing buffer"""
+    view = getattr(_hash_buffers, "view", None)
+    if view is None:
+        view = _hash_buffers.view = memoryview(bytearray(HASH_CHUNK_SIZE))
+    return view
+
+
+# Reused encoders: json.dumps()/dump() build a fresh JSONEncoder on every call
+# that passes options. ASCII escaping stays on, since undecodable file names
+# carry lone surrogates that cannot be written as UTF-8.
+def _json_default(obj: Any) -> Any:
+    """Write read-only mappings (Level 3's "files" view) as JSON objects"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_JSON_COMPACT = json.JSONEncoder(separators=(",", ":"), default=_json_default)
+_JSON_PRETTY = json.JSONEncoder(indent=2, default=_json_default)
+
+
+# Private MIME registry, loaded once with the same system files mimetypes.init() reads
+_MIME = mimetypes.MimeTypes()
+for _mime_file in mimetypes.knownfiles:
+    if os.path.isfile(_mime_file):
+        _MIME.read(_mime_file)
+
+
+@functools.lru_cache(maxsize=4096)
+def _guess_mime_for_suffix(suffix: str) -> Optional[str]:
+    """MIME type for a full suffix such as ".py" or ".tar.gz" (memoized)"""
+    return _MIME.guess_type("f" + suffix)[0]
+
+
+def _guess_mime_type(file_name: str) -> Optional[str]:
+    """Guess a MIME type from the file name alone, without touching the disk"""
+    # Only the suffix after the first non-leading dot affects the guess
+    stem = file_name.lstrip(".")
+    dot = stem.find(".")
+    return _guess_mime_for_suffix(stem[dot:] if dot >= 0 else "")
+
+
+def _hasher_factory(algo: str):
+    """Return a zero-argument constructor for the named hash algorithm"""
+    if algo == "xxh3_64" and xxhash is not None:
+        return xxhash.xxh3_64
+    if algo == "blake3" and blake3 is not None:
+        return functools.partial(blake3.blake3, max_threads=blake3.blake3.AUTO)
+    if algo == "blake2b_128":
+        return functools.partial(hashlib.blake2b, digest_size=16)
+    if algo in hashlib.algorithms_available and not algo.startswith("shake_"):
+        return getattr(hashlib, algo, None) or functools.partial(hashlib.new, algo)
+    raise ValueError(f"REALITY_FS_007: Unsupported or unavailable hash algorithm: {algo}")
+
+
+def _pygit2_status_code(flags: int) -> str:
+    """Translate pygit2 status flags into the porcelain code `git status` would print"""
+    if flags & pygit2.GIT_STATUS_CONFLICTED:
+        return "UU"
+    if flags & pygit2.GIT_STATUS_WT_NEW:
+        return "??"
+    
+    index_codes = ((pygit2.GIT_STATUS_INDEX_NEW, "A"), (pygit2.GIT_STATUS_INDEX_MODIFIED, "M"),
+                   (pygit2.GIT_STATUS_INDEX_DELETED, "D"), (pygit2.GIT_STATUS_INDEX_RENAMED, "R"),
+                   (pygit2.GIT_STATUS_INDEX_TYPECHANGE, "T"))
+    worktree_codes = ((pygit2.GIT_STATUS_WT_MODIFIED, "M"), (pygit2.GIT_STATUS_WT_DELETED, "D"),
+                      (pygit2.GIT_STATUS_WT_RENAMED, "R"), (pygit2.GIT_STATUS_WT_TYPECHANGE, "T"))
+    x = next((code for flag, code in index_codes if flags & flag), " ")
+    y = next((code for flag, code in worktree_codes if flags & flag), " ")
+    return (x + y).strip() or "clean"
+
+
+def _compile_globs(patterns: List[str]) -> "re.Pattern[str]":
+    """Compile glob patterns into a single case-insensitive regex union"""
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_ignore_patterns(patterns: Tuple[str, ...]) -> "re.Pattern[str]":
+    """Compile ignore globs into one regex, shared by every connector with the same list"""
+    regexes = filter(None, (_ignore_pattern_regex(p) for p in patterns))
+    return re.compile("|".join(f"(?:{r})" for r in regexes))
+
+
+def _ignore_pattern_regex(pattern: str) -> Optional[str]:
+    """Translate one .gitignore-style glob into a regex over a relative POSIX path
+    
+    Patterns without an inner slash match a name at any depth; patterns with
+    one (or a leading slash) are anchored to the root. A match on a directory
+    also covers everything below it.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+    if not pattern:
+        return None
+    
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                i += 2
+                if pattern.startswith("/", i):
+                    i += 1
+                    parts.append("(?:.*/)?")  # "**/" spans zero or more directories
+                else:
+                    parts.append(".*")
+                continue
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[" and pattern.find("]", i + 1) > i + 1:
+            end = pattern.find("]", i + 1)
+            body = pattern[i + 1:end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    
+    return ("^" if anchored else "(?:^|/)") + "".join(parts) + "(?:/|$)"
+
+
+class _FileDetailsView(Mapping):
+    """Read-only {path: {field: value}} view of a Level 3 "file_columns" table;
+    each file's dict is built when it is looked up"""
+    
+    def __init__(self, columns: Dict[str, List[Any]], fields: Tuple[str, ...]):
+        self._paths = columns.get("path", [])
+        self._fields = [(name, columns[name]) for name in fields if name in columns]
+        self._index: Optional[Dict[str, int]] = None
+    
+    def __getitem__(self, path: str) -> Dict[str, Any]:
+        if self._index is None:
+            self._index = {p: i for i, p in enumerate(self._paths)}
+        i = self._index[path]
+        return {name: values[i] for name, values in self._fields if values[i] is not None}
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+    
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
 class FileSystemConnector:
     """Reality-based file system connector with progressive discovery"""
     
     # Constants from SPEC-002
     MAX_DEPTH = 10
     MAX_FILES_PER_DIR = 1000
+    MAX_FILES_ANALYZED = 1000  # Level 3 detailed analysis limit
     MAX_FILE_SIZE_FULL_READ = 1_000_000  # 1MB
+    TAIL_WINDOW = 64 * 1024  # Backwards read size when sampling large files
+    MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Level 3 file inspection threads
     
     # Enhanced privacy patterns - NEVER read these
     NEVER_READ_CONTENT = [
@@ -46,6 +237,30 @@ class FileSystemConnector:
         "*.kdbx"  # Password manager databases
     ]
     
+    # Privacy patterns compiled once per process (matched against file names)
+    _NEVER_READ_RE = _compile_globs(NEVER_READ_CONTENT)
+    _NEVER_HASH_RE = _compile_globs(NEVER_HASH + NEVER_READ_CONTENT)
+    
+    # Ignore files read from the root path
+    IGNORE_FILES = (".gitignore", ".fs-agent-ignore")
+    
+    # Default ignore patterns
+    DEFAULT_IGNORES = frozenset({"node_modules", ".git", "__pycache__", ".cache", "venv", ".venv", ".env"})
+    
+    # Per-file fields stored as parallel lists in Level 3 "file_columns"
+    FILE_COLUMNS = ("size_bytes", "permissions", "modified", "type", "git_status",
+                    "hash", "content_preview", "content_sample")
+    
+    # Change-detection hash; any hashlib algorithm, or "xxh3_64"/"blake3" when installed.
+    # Hashes are only comparable between snapshots taken with the same algorithm.
+    HASH_ALGO = "sha256"
+    
+    # Case-sensitivity results shared by all instances, keyed by st_dev
+    _case_sensitivity_by_device: Dict[int, bool] = {}
+    
+    # `git rev-parse --show-toplevel` results shared by all instances, keyed by root path
+    _git_root_by_path: Dict[Path, Optional[Path]] = {}
+    
     # Cache TTL in seconds (reused from Supabase agent)
     CACHE_TTL = {
         "structure": 60,      # Directory structure
@@ -54,8 +269,20 @@ class FileSystemConnector:
         "snapshot": 3600      # Full snapshots
     }
     
-    def __init__(self, root_path: Optional[str] = None):
-        """Initialize connector with optional root path"""
+    def __init__(self, root_path: Optional[str] = None, hash_algo: Optional[str] = None,
+                 hash_workers: Optional[int] = None, inline_tree: bool = False,
+                 cache_dir: Optional[str] = None):
+        """Initialize connector with optional root path, hash algorithm, Level 3 thread count
+        and cache directory (default: .cache next to this module)
+        
+        inline_tree also returns the nested directory tree in Level 2 "details.tree", as before
+        the tree was streamed to disk (memory grows with the size of the tree).
+        """
+        self.hash_algo = hash_algo or self.HASH_ALGO
+        self._new_hasher = _hasher_factory(self.hash_algo)
+        self.hash_workers = hash_workers or self.MAX_WORKERS
+        self.inline_tree = inline_tree
+        
         if root_path:
             self.root_path = Path(root_path).resolve()
         else:
@@ -68,7 +295,7 @@ class FileSystemConnector:
             raise ValueError(f"REALITY_FS_002: Root path is not a directory: {self.root_path}")
             
         # Set up cache directory (reusing pattern from Supabase)
-        self.cache_dir = Path(__file__).parent / ".cache"
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(__file__).parent / ".cache"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.snapshots_dir = self.cache_dir / "snapshots"
         self.snapshots_dir.mkdir(exist_ok=True)
@@ -78,49 +305,116 @@ class FileSystemConnector:
         self.session_id = self._generate_session_id()
         self.discovery_level = 0
         
+        # Parsed cache files, so each is read from disk at most once per session
+        self._cache_memo: Dict[str, Dict[str, Any]] = {}
+        
+        # Persistent per-file hashes of this root: {absolute path: [size, mtime_ns, mode,
+        # uid, gid, hash]}, loaded on the first Level 3; the entries the current walk
+        # used are kept apart so that saving drops deleted and no longer walked files
+        self._file_hashes: Optional[Dict[str, List[Any]]] = None
+        self._file_hashes_seen: Dict[str, List[Any]] = {}
+        self._file_hashes_changed = False
+        
+        # Ignore files are parsed once; per-path results are memoized
+        self._ignore_re = self._load_ignore_patterns()
+        self._ignore_cache: Dict[str, bool] = {}
+        
+        # Level 3 candidates (path, relative path) gathered by the last Level 2 walk
+        self._level_2_files: Optional[List[Tuple[Path, str]]] = None
+        
+        # Bulk git status and ignore results (timestamp, data), each loaded on first use
+        self._git_state: Optional[Tuple[float, Dict[str, str]]] = None
+        self._git_ignored: Optional[Tuple[float, Set[str]]] = None
+        self._git_lock = threading.Lock()  # Also serializes every use of _git_repo
+        self._git_repo = None  # pygit2.Repository when pygit2 is installed
+        
         # Platform-specific settings
         self.platform = platform.system()
         self.case_sensitive = self._check_case_sensitivity()
         
     def _generate_session_id(self) -> str:
-        """Generate unique session ID for this connection (reused from Supabase)"""
-        timestamp = datetime.now().isoformat()
-        unique_str = f"{self.root_path}-{timestamp}-{os.getpid()}"
-        return hashlib.md5(unique_str.encode()).hexdigest()[:8]
+        """Generate unique session ID for this connection (8 hex chars, as in Supabase)"""
+        return secrets.token_hex(4)
     
     def _check_case_sensitivity(self) -> bool:
-        """Check if the file system is case-sensitive"""
-        test_file = self.cache_dir / "TeSt_CaSe.tmp"
-        test_file_lower = self.cache_dir / "test_case.tmp"
-        
+        """Check if the file system is case-sensitive (without writing to it)"""
         try:
-            test_file.touch()
-            case_sensitive = not test_file_lower.exists()
-            test_file.unlink()
+            device = os.stat(self.cache_dir).st_dev
+            if device in self._case_sensitivity_by_device:
+                return self._case_sensitivity_by_device[device]
+            
+            # Look up an existing entry under its case-swapped name
+            case_sensitive = True  # Assume case-sensitive if test fails
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    swapped = entry.name.swapcase()
+                    if swapped != entry.name:
+                        swapped_path = os.path.join(self.cache_dir, swapped)
+                        case_sensitive = not (os.path.exists(swapped_path) and
+                                              os.path.samefile(swapped_path, entry.path))
+                        break
+            
+            self._case_sensitivity_by_device[device] = case_sensitive
             return case_sensitive
         except:
             return True  # Assume case-sensitive if test fails
     
     def _get_cache_path(self, cache_type: str) -> Path:
         """Get cache file path for given type (reused from Supabase)"""
-        return self.cache_dir / f"{cache_type}_{self.session_id}.json"
+        return self.cache_dir / f"{cache_type}_{self.session_id}.pkl"
+    
+    def _get_tree_path(self) -> Path:
+        """Get the streamed Level 2 directory tree path (one JSON record per line)"""
+        return self.cache_dir / f"fs_level_2_tree_{self.session_id}.jsonl"
+    
+    def _load_cache(self, cache_type: str) -> Optional[Dict[str, Any]]:
+        """Load cache data from memory, falling back to the cache file once per session"""
+        cache_data = self._cache_memo.get(cache_type)
+        if cache_data is None:
+            cache_data = self._read_cache_file(self._get_cache_path(cache_type))
+            if cache_data is None:
+                return None
+            self._cache_memo[cache_type] = cache_data
+        return cache_data
+    
+    @staticmethod
+    def _read_cache_file(cache_path: Path) -> Optional[Any]:
+        """Read a pickled cache file, falling back to a legacy JSON file beside it"""
+        try:
+            return pickle.loads(cache_path.read_bytes())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None
+        
+        try:
+            return json.loads(cache_path.with_suffix(".json").read_bytes())
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _write_cache_file(cache_path: Path, data: Any) -> None:
+        """Pickle data to a temp file and swap it in atomically"""
+        # Caches are private to this connector and never a wire format; the
+        # per-process temp name keeps concurrent writers from sharing one
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp_path, cache_path)
     
     def _is_cache_valid(self, cache_type: str) -> bool:
         """Check if cache is still valid based on TTL (reused from Supabase)"""
-        cache_path = self._get_cache_path(cache_type)
-        
-        if not cache_path.exists():
+        cache_data = self._load_cache(cache_type)
+        if cache_data is None:
             return False
         
         try:
-            cache_data = json.loads(cache_path.read_text())
             cached_time = datetime.fromisoformat(cache_data.get("timestamp", ""))
             ttl_seconds = self.CACHE_TTL.get(cache_type, 300)
             
             if datetime.now() - cached_time < timedelta(seconds=ttl_seconds):
                 return True
                 
-        except (json.JSONDecodeError, ValueError):
+        except (TypeError, ValueError):
             pass
         
         return False
@@ -128,32 +422,66 @@ class FileSystemConnector:
     def _get_cached_data(self, cache_type: str) -> Optional[Dict[str, Any]]:
         """Retrieve cached data if valid (reused from Supabase)"""
         if self._is_cache_valid(cache_type):
-            try:
-                return json.loads(self._get_cache_path(cache_type).read_text())
-            except Exception:
-                pass
+            # Shallow copy so callers can flag "from_cache" without touching the memo
+            return dict(self._cache_memo[cache_type])
         return None
     
     def _save_cache(self, cache_type: str, data: Dict[str, Any]) -> None:
         """Save data to cache with timestamp (reused from Supabase)"""
         data["timestamp"] = datetime.now().isoformat()
-        cache_path = self._get_cache_path(cache_type)
-        cache_path.write_text(json.dumps(data, indent=2))
+        self._write_cache_file(self._get_cache_path(cache_type), data)
+        self._cache_memo[cache_type] = data
     
-    def _should_read_content(self, file_path: Path) -> bool:
-        """Check if file content should be read based on privacy patterns"""
-        file_name = file_path.name.lower()
+    def _get_file_hashes_path(self) -> Path:
+        """Get the per-file hash cache path (shared across sessions, one per root and algorithm)"""
+        root_key = hashlib.sha256(os.fsencode(self.root_path)).hexdigest()[:16]
+        return self.cache_dir / f"file_hashes_{self.hash_algo}_{root_key}.pkl"
+    
+    def _load_file_hashes(self) -> Dict[str, List[Any]]:
+        """Load the per-file hash cache, starting empty if it is missing or unreadable"""
+        file_hashes = self._read_cache_file(self._get_file_hashes_path())
+        return file_hashes if isinstance(file_hashes, dict) else {}
+    
+    def _save_file_hashes(self) -> None:
+        """Replace the per-file hash cache with the entries the current walk used"""
+        seen = self._file_hashes_seen
+        if self._file_hashes_changed or len(seen) != len(self._file_hashes or {}):
+            self._write_cache_file(self._get_file_hashes_path(), seen)
+        self._file_hashes = seen
+        self._file_hashes_seen = {}
+        self._file_hashes_changed = False
+    
+    @staticmethod
+    def _fast_check(stat: os.stat_result) -> List[int]:
+        """Metadata that must be unchanged for a stored hash to be reused"""
+        return [stat.st_size, stat.st_mtime_ns, stat.st_mode, stat.st_uid, stat.st_gid]
+    
+    def _cached_file_hash(self, file_path: Path, stat: os.stat_result) -> str:
+        """Hash a file, reusing the stored hash while its size, mtime, mode and owner are unchanged"""
+        key = str(file_path)
+        fast_check = self._fast_check(stat)
+        cached = self._file_hashes.get(key)
+        if cached is not None and cached[:-1] == fast_check:
+            self._file_hashes_seen[key] = cached
+            return cached[-1]
         
+        file_hash = self._calculate_file_hash(file_path, stat.st_size)
+        if not file_hash.startswith(("error:", "skipped:")):
+            self._file_hashes_seen[key] = fast_check + [file_hash]
+            self._file_hashes_changed = True
+        return file_hash
+    
+    def _should_read_content(self, file_path: Path, size: Optional[int] = None) -> bool:
+        """Check if file content should be read based on privacy patterns"""
         # Check against privacy patterns
-        for pattern in self.NEVER_READ_CONTENT:
-            # Simple pattern matching (can be enhanced with fnmatch)
-            pattern_lower = pattern.lower().replace("*", "")
-            if pattern_lower in file_name:
-                return False
+        if self._NEVER_READ_RE.match(file_path.name):
+            return False
         
-        # Check file size
+        # Check file size (callers that already stat'ed the file pass it in)
         try:
-            if file_path.stat().st_size > self.MAX_FILE_SIZE_FULL_READ:
+            if size is None:
+                size = file_path.stat().st_size
+            if size > self.MAX_FILE_SIZE_FULL_READ:
                 return False
         except:
             return False
@@ -162,77 +490,117 @@ class FileSystemConnector:
     
     def _detect_file_type(self, file_path: Path) -> str:
         """Detect MIME type of file"""
-        mime_type, _ = mimetypes.guess_type(str(file_path))
+        mime_type = _guess_mime_type(file_path.name)
         if mime_type:
             return mime_type
             
-        # Check if text file by trying to read first few bytes
+        # Unknown extension: check if text file by trying to read first few bytes
         try:
-            with open(file_path, 'rb') as f:
-                chunk = f.read(512)
-                if b'\x00' in chunk:
-                    return "application/octet-stream"  # Binary file
-                else:
-                    return "text/plain"  # Likely text file
+            chunk = self._fast_read(file_path, 512)
+            if b'\x00' in chunk:
+                return "application/octet-stream"  # Binary file
+            else:
+                return "text/plain"  # Likely text file
         except:
             return "unknown"
     
-    def _calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA-256 hash of file for change detection"""
-        # Check if we should hash this file
-        file_name = file_path.name.lower()
-        for pattern in self.NEVER_HASH:
-            pattern_clean = pattern.lower().replace("*", "")
-            if pattern_clean in file_name:
-                return "skipped:privacy"
-        
-        # Also check against NEVER_READ_CONTENT patterns for consistency
-        for pattern in self.NEVER_READ_CONTENT:
-            if pattern.startswith("id_") and file_name.startswith(pattern.replace("*", "").lower()):
-                return "skipped:privacy"
-            pattern_clean = pattern.lower().replace("*", "")
-            if pattern_clean and pattern_clean in file_name:
-                return "skipped:privacy"
-        
-        sha256_hash = hashlib.sha256()
+    @staticmethod
+    def _hash_strategy(size: int) -> str:
+        """How a file of this size is hashed: mmap at or above MMAP_HASH_THRESHOLD, else a read loop"""
+        return "mmap" if size >= MMAP_HASH_THRESHOLD else "read"
+    
+    def _calculate_file_hash(self, file_path: Path, size: Optional[int] = None) -> str:
+        """Calculate hash of file for change detection (SHA-256 unless hash_algo says otherwise)"""
+        # Check if we should hash this file (NEVER_HASH plus NEVER_READ_CONTENT)
+        if self._NEVER_HASH_RE.match(file_path.name):
+            return "skipped:privacy"
+        
+        file_hash = self._new_hasher()
         
         try:
-            with open(file_path, "rb") as f:
-                # Read in chunks to handle large files
-                for byte_block in iter(lambda: f.read(65536), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            with open(file_path, "rb", buffering=0) as f:
+                # Callers that already stat'ed the file pass its size in
+                if size is None:
+                    size = os.fstat(f.fileno()).st_size
+                if self._hash_strategy(size) == "mmap":
+                    # Hash straight from the page cache without copying
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if hasattr(mmap, "MADV_SEQUENTIAL"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        file_hash.update(mm)
+                else:
+                    # Unbuffered reads straight into the reusable 1 MiB buffer
+                    buffer = _get_hash_buffer()
+                    while n := f.readinto(buffer):
+                        file_hash.update(buffer[:n])
+            return file_hash.hexdigest()
         except Exception as e:
             return f"error:{str(e)}"
     
-    def _respect_ignore_patterns(self, path: Path) -> bool:
-        """Check if path should be ignored based on .gitignore and .fs-agent-ignore"""
-        # Simple implementation - can be enhanced with gitignore parser
-        ignore_files = [".gitignore", ".fs-agent-ignore"]
+    @staticmethod
+    def _fast_read(file_path: Path, max_bytes: int) -> bytes:
+        """Read up to max_bytes from the start of a file with bare os.open/os.read
         
-        for ignore_file in ignore_files:
+        Skips the fstat, ioctl and lseek calls that open() makes to set up a
+        buffered file object; a single read is enough for short heads of files.
+        """
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            return os.read(fd, max_bytes)
+        finally:
+            os.close(fd)
+    
+    def _read_preview(self, file_path: Path, chars: int = 500) -> str:
+        """Read the first characters of a text file through the per-thread buffer"""
+        # At most 4 UTF-8 bytes per character, so this many bytes always suffice
+        view = _get_hash_buffer()[:chars * 4]
+        if hasattr(os, "readv"):
+            # Bare descriptor read straight into the buffer: open, read, close
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                n = os.readv(fd, [view])
+            finally:
+                os.close(fd)
+        else:
+            data = self._fast_read(file_path, len(view))
+            n = len(data)
+            view[:n] = data
+        # Decode in place and apply the same newline translation as text mode
+        text = str(view[:n], 'utf-8', 'ignore').replace("\r\n", "\n").replace("\r", "\n")
+        return text[:chars]
+    
+    def _load_ignore_patterns(self) -> "re.Pattern[str]":
+        """Read .gitignore and .fs-agent-ignore once and compile all patterns into one regex"""
+        patterns = sorted(self.DEFAULT_IGNORES)
+        
+        for ignore_file in self.IGNORE_FILES:
             ignore_path = self.root_path / ignore_file
             if ignore_path.exists():
                 try:
-                    patterns = ignore_path.read_text().splitlines()
-                    for pattern in patterns:
+                    for pattern in ignore_path.read_text().splitlines():
                         pattern = pattern.strip()
-                        if not pattern or pattern.startswith("#"):
-                            continue
-                        # Simple pattern matching
-                        if pattern in str(path.relative_to(self.root_path)):
-                            return True
+                        # Negations cannot be expressed in a single union; skip them
+                        if pattern and not pattern.startswith(("#", "!")):
+                            patterns.append(pattern)
                 except:
                     pass
         
-        # Default ignore patterns
-        default_ignores = ["node_modules", ".git", "__pycache__", ".cache", "venv", ".env"]
-        path_str = str(path.relative_to(self.root_path))
-        for ignore in default_ignores:
-            if ignore in path_str:
-                return True
-                
-        return False
+        # Glob semantics, all patterns matched in a single regex pass
+        return _compile_ignore_patterns(tuple(patterns))
+    
+    def _respect_ignore_patterns(self, path: Path) -> bool:
+        """Check if path should be ignored based on .gitignore and .fs-agent-ignore"""
+        return self._is_ignored_rel(path.relative_to(self.root_path).as_posix())
+    
+    def _is_ignored_rel(self, rel_path: str) -> bool:
+        """Ignore check for a "/"-separated path relative to the root (as tracked by the walkers)"""
+        ignored = self._ignore_cache.get(rel_path)
+        if ignored is None:
+            # Anything below an ignored directory is ignored too
+            ignored = (self._ignore_cache.get(rel_path.rpartition("/")[0], False) or
+                       self._ignore_re.search(rel_path) is not None)
+            self._ignore_cache[rel_path] = ignored
+        return ignored
     
     def _sample_large_file(self, file_path: Path, lines: int = 100) -> Dict[str, Any]:
         """Read first and last N lines of large files"""
@@ -244,19 +612,39 @@ class FileSystemConnector:
         }
         
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            with open(file_path, 'rb') as f:
                 # Read first N lines
                 for i in range(lines):
                     line = f.readline()
                     if not line:
                         break
-                    result["first_lines"].append(line.rstrip())
+                    result["first_lines"].append(line.decode('utf-8', errors='ignore').rstrip())
                 
-                # Count total lines and get last N
+                # Count total lines in fixed-size chunks
                 f.seek(0)
-                all_lines = f.readlines()
-                result["total_lines"] = len(all_lines)
-                result["last_lines"] = [line.rstrip() for line in all_lines[-lines:]]
+                newlines = 0
+                last_byte = b""
+                while chunk := f.read(HASH_CHUNK_SIZE):
+                    newlines += chunk.count(b"\n")
+                    last_byte = chunk[-1:]
+                result["total_lines"] = newlines + (1 if last_byte not in (b"", b"\n") else 0)
+                
+                # Read backwards from the end until we hold the last N lines
+                pos = f.seek(0, os.SEEK_END)
+                tail = b""
+                while pos > 0 and tail.count(b"\n") <= lines:
+                    step = min(self.TAIL_WINDOW, pos)
+                    pos -= step
+                    f.seek(pos)
+                    tail = f.read(step) + tail
+                
+                text = tail.decode('utf-8', errors='ignore').replace("\r\n", "\n").replace("\r", "\n")
+                tail_lines = text.split("\n")
+                if tail_lines and tail_lines[-1] == "":
+                    tail_lines.pop()
+                if pos > 0:
+                    tail_lines = tail_lines[1:]  # First line is partial
+                result["last_lines"] = [line.rstrip() for line in tail_lines[-lines:]]
                 
         except Exception as e:
             result["error"] = str(e)
@@ -265,6 +653,23 @@ class FileSystemConnector:
     
     def _check_git_available(self) -> bool:
         """Check if git is available and we're in a git repository"""
+        self._git_repo = None
+        if pygit2 is not None:
+            try:
+                repo_path = pygit2.discover_repository(str(self.root_path))
+                if repo_path:
+                    repo = pygit2.Repository(repo_path)
+                    if repo.workdir:
+                        self._git_repo = repo
+                        self.git_root = Path(repo.workdir).resolve()
+                        return True
+            except Exception:
+                pass  # Fall back to the git CLI
+        
+        if self.root_path in self._git_root_by_path:
+            self.git_root = self._git_root_by_path[self.root_path]
+            return self.git_root is not None
+        
         try:
             result = subprocess.run(
                 ["git", "rev-parse", "--show-toplevel"],
@@ -274,10 +679,82 @@ class FileSystemConnector:
                 timeout=2
             )
             self.git_root = Path(result.stdout.strip()) if result.returncode == 0 else None
-            return result.returncode == 0
         except:
             self.git_root = None
-            return False
+            return False  # Not remembered, so a later instance can retry
+        
+        self._git_root_by_path[self.root_path] = self.git_root
+        return self.git_root is not None
+    
+    def _load_git_state(self) -> Dict[str, str]:
+        """Bulk-load git status codes
+        
+        Uses pygit2 in-process when available, otherwise one git call.
+        Results are shared by every per-file lookup and refreshed after the
+        metadata cache TTL.
+        """
+        with self._git_lock:
+            if self._git_state and time.monotonic() - self._git_state[0] < self.CACHE_TTL["metadata"]:
+                return self._git_state[1]
+            
+            if self._git_repo is not None:
+                status_map = {
+                    path: _pygit2_status_code(flags)
+                    for path, flags in self._git_repo.status().items()
+                    if not flags & pygit2.GIT_STATUS_IGNORED
+                }
+                self._git_state = (time.monotonic(), status_map)
+                return status_map
+            
+            status_map: Dict[str, str] = {}
+            
+            # NUL-separated porcelain v1: "XY path", renames/copies add the old path
+            result = subprocess.run(
+                ["git", "status", "--porcelain=v1", "-z", "-uall"],
+                capture_output=True,
+                cwd=self.git_root or self.root_path,
+                timeout=10
+            )
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode(errors="replace").strip())
+            records = iter(result.stdout.decode(errors="surrogateescape").split("\0"))
+            for record in records:
+                if len(record) < 4:
+                    continue
+                status_map[record[3:]] = record[:2].strip() or "clean"
+                if record[0] in "RC":
+                    next(records, None)
+            
+            self._git_state = (time.monotonic(), status_map)
+            return status_map
+    
+    def _load_git_ignored(self) -> Set[str]:
+        """Bulk-load ignored paths with the git CLI, fully ignored directories
+        collapsed to "dir/"; only _is_git_ignored() needs them, so discovery never
+        pays for this scan. Refreshed after the metadata cache TTL."""
+        with self._git_lock:
+            if self._git_ignored and time.monotonic() - self._git_ignored[0] < self.CACHE_TTL["metadata"]:
+                return self._git_ignored[1]
+            
+            result = subprocess.run(
+                ["git", "ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory"],
+                capture_output=True,
+                cwd=self.git_root or self.root_path,
+                timeout=10
+            )
+            ignored: Set[str] = set()
+            if result.returncode == 0:
+                ignored = {p for p in result.stdout.decode(errors="surrogateescape").split("\0") if p}
+            
+            self._git_ignored = (time.monotonic(), ignored)
+            return ignored
+    
+    def _git_relative_path(self, file_path: Path) -> Optional[str]:
+        """Path relative to the git root in git's own format, or None if outside it"""
+        try:
+            return file_path.relative_to(self.git_root or self.root_path).as_posix()
+        except ValueError:
+            return None
     
     def _get_git_status(self, file_path: Path) -> str:
         """Get git status for a file (M=modified, A=added, D=deleted, ??=untracked)"""
@@ -287,35 +764,17 @@ class FileSystemConnector:
         if not self.git_available:
             return "no_git"
         
+        rel_path = self._git_relative_path(file_path)
+        if rel_path is None:
+            return "outside_git"
+        
         try:
-            # Get relative path from git root
-            if self.git_root:
-                try:
-                    rel_path = file_path.relative_to(self.git_root)
-                except ValueError:
-                    return "outside_git"
-            else:
-                rel_path = file_path
-            
-            result = subprocess.run(
-                ["git", "status", "--porcelain", str(rel_path)],
-                capture_output=True,
-                text=True,
-                cwd=self.git_root or self.root_path,
-                timeout=1
-            )
-            
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                if not output:
-                    return "clean"  # Tracked and unmodified
-                else:
-                    # Return the git status code (first 2 chars)
-                    return output[:2].strip() or "clean"
-            else:
-                return "error"
+            status_map = self._load_git_state()
         except:
             return "error"
+        
+        # Tracked and unmodified files do not appear in porcelain output
+        return status_map.get(rel_path, "clean")
     
     def _is_git_ignored(self, file_path: Path) -> bool:
         """Check if file is ignored by git"""
@@ -325,16 +784,48 @@ class FileSystemConnector:
         if not self.git_available:
             return False
         
+        rel_path = self._git_relative_path(file_path)
+        if rel_path is None:
+            return False
+        
         try:
-            result = subprocess.run(
-                ["git", "check-ignore", str(file_path)],
-                capture_output=True,
-                cwd=self.git_root or self.root_path,
-                timeout=1
-            )
-            return result.returncode == 0  # Returns 0 if file is ignored
+            if self._git_repo is not None:
+                # The Repository handle is not thread-safe; status() holds the same lock
+                with self._git_lock:
+                    return self._git_repo.path_is_ignored(rel_path)
+            ignored = self._load_git_ignored()
         except:
             return False
+        
+        if rel_path in ignored:
+            return True
+        # The file may sit inside a directory git reported as wholly ignored
+        parts = rel_path.split("/")
+        return any("/".join(parts[:i]) + "/" in ignored for i in range(1, len(parts)))
+    
+    def _effective_access(self, st: os.stat_result, vfs: Optional[Any] = None) -> Tuple[bool, bool]:
+        """Derive (readable, writable) for the root from one stat instead of two os.access() probes
+        
+        Mirrors the kernel's owner/group/other check for the effective ids;
+        ACLs are not consulted. Falls back to os.access() where effective ids
+        are unavailable (Windows).
+        """
+        if not hasattr(os, "geteuid"):
+            return os.access(self.root_path, os.R_OK), os.access(self.root_path, os.W_OK)
+        
+        read_only_mount = vfs is not None and bool(vfs.f_flag & getattr(os, "ST_RDONLY", 0))
+        euid = os.geteuid()
+        if euid == 0:
+            return True, not read_only_mount
+        
+        if st.st_uid == euid:
+            read_bit, write_bit = stat_module.S_IRUSR, stat_module.S_IWUSR
+        elif st.st_gid == os.getegid() or st.st_gid in os.getgroups():
+            read_bit, write_bit = stat_module.S_IRGRP, stat_module.S_IWGRP
+        else:
+            read_bit, write_bit = stat_module.S_IROTH, stat_module.S_IWOTH
+        
+        return bool(st.st_mode & read_bit), bool(st.st_mode & write_bit) and not read_only_mount
     
     def discover_level_1(self) -> Dict[str, Any]:
         """Level 1: File system availability and permissions check"""
@@ -371,8 +862,24 @@ class FileSystemConnector:
         
         # Test file system access
         try:
+            # Get available disk space (statvfs also reports read-only mounts)
+            vfs = None
+            try:
+                vfs = os.statvfs(self.root_path)
+                result["connection"]["available_space_bytes"] = vfs.f_bavail * vfs.f_frsize
+            except AttributeError:
+                # Windows doesn't have statvfs
+                if self.platform == "Windows":
+                    import shutil
+                    total, used, free = shutil.disk_usage(self.root_path)
+                    result["connection"]["available_space_bytes"] = free
+            except:
+                result["metadata"]["limitations"].append("Cannot determine available disk space")
+            
+            can_read, can_write = self._effective_access(os.stat(self.root_path), vfs)
+            
             # Check if we can read the root directory
-            if os.access(self.root_path, os.R_OK):
+            if can_read:
                 result["connection"]["permission_level"] = "read"
                 result["connection"]["status"] = "connected"
                 result["metadata"]["confidence_score"] = 1.0
@@ -383,22 +890,9 @@ class FileSystemConnector:
                 result["metadata"]["limitations"].append("Limited read access to root path")
             
             # Check if we can write (but don't actually write)
-            if os.access(self.root_path, os.W_OK):
+            if can_write:
                 result["connection"]["permission_level"] = "read_write"
             
-            # Get available disk space
-            try:
-                stat = os.statvfs(self.root_path)
-                result["connection"]["available_space_bytes"] = stat.f_bavail * stat.f_frsize
-            except AttributeError:
-                # Windows doesn't have statvfs
-                if self.platform == "Windows":
-                    import shutil
-                    total, used, free = shutil.disk_usage(self.root_path)
-                    result["connection"]["available_space_bytes"] = free
-            except:
-                result["metadata"]["limitations"].append("Cannot determine available disk space")
-            
             # Test ability to list directory contents
             try:
                 list(self.root_path.iterdir())
@@ -436,7 +930,7 @@ class FileSystemConnector:
         cached = self._get_cached_data("fs_level_2")
         if cached:
             cached["from_cache"] = True
-            return cached
+            return self._with_inline_tree(cached)
         
         # Check git availability once at the start
         self.git_available = self._check_git_available()
@@ -464,7 +958,7 @@ class FileSystemConnector:
                     "git_root": str(self.git_root) if hasattr(self, 'git_root') and self.git_root else None
                 },
                 "details": {
-                    "tree": {}
+                    "tree_file": None  # Streamed .jsonl; see load_structure_tree()
                 }
             }
         }
@@ -476,8 +970,11 @@ class FileSystemConnector:
         max_depth = 0
         symlinks = 0
         skipped_dirs = []
+        level_3_files: List[Tuple[Path, str]] = []  # First files Level 3 will analyze
         
-        def traverse_directory(path: Path, depth: int = 0) -> Dict[str, Any]:
+        def scan_directory(path: Path, rel: str, depth: int,
+                           child_dirs: List[Tuple[Path, str]]) -> Dict[str, Any]:
+            """Summarize one directory; subdirectories are queued in child_dirs"""
             nonlocal files_counted, dirs_counted, max_depth, symlinks, skipped_dirs
             
             if depth > self.MAX_DEPTH:
@@ -493,17 +990,17 @@ class FileSystemConnector:
             dir_info = {
                 "file_count": 0,
                 "dir_count": 0,
-                "size_bytes": 0,
-                "subdirs": {}
+                "size_bytes": 0
             }
             
+            # Check if we should skip this directory, before listing it
+            if self._is_ignored_rel(rel):
+                skipped_dirs.append(rel or ".")
+                return {"skipped": "ignored"}
+            
             try:
-                entries = list(path.iterdir())
-                
-                # Check if we should skip this directory
-                if self._respect_ignore_patterns(path):
-                    skipped_dirs.append(str(path.relative_to(self.root_path)))
-                    return {"skipped": "ignored"}
+                with os.scandir(path) as it:
+                    entries = list(it)
                 
                 # Limit files per directory
                 if len(entries) > self.MAX_FILES_PER_DIR:
@@ -511,29 +1008,34 @@ class FileSystemConnector:
                     entries = entries[:self.MAX_FILES_PER_DIR]
                 
                 for entry in entries:
+                    # DirEntry answers type checks from the directory listing
                     try:
                         if entry.is_symlink():
                             symlinks += 1
                             continue  # Never follow symlinks
                         
-                        if entry.is_file():
+                        if entry.is_file(follow_symlinks=False):
                             dir_info["file_count"] += 1
                             files_counted += 1
                             try:
-                                dir_info["size_bytes"] += entry.stat().st_size
+                                entry_stat = entry.stat(follow_symlinks=False)
+                                dir_info["size_bytes"] += entry_stat.st_size
                             except:
-                                pass
-                        elif entry.is_dir():
+                                continue
+                            
+                            # Collect Level 3 candidates during this walk so it needs no second one
+                            if len(level_3_files) < self.MAX_FILES_ANALYZED:
+                                entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+                                if not self._is_ignored_rel(entry_rel):
+                                    level_3_files.append((Path(entry.path), entry_rel))
+                        elif entry.is_dir(follow_symlinks=False):
                             dir_info["dir_count"] += 1
                             dirs_counted += 1
-                            # Recursive traversal
-                            subdir_info = traverse_directory(entry, depth + 1)
-                            if not subdir_info.get("skipped"):
-                                dir_info["subdirs"][entry.name] = subdir_info
+                            child_dirs.append((Path(entry.path), f"{rel}/{entry.name}" if rel else entry.name))
                     except PermissionError:
-                        result["metadata"]["limitations"].append(f"Permission denied: {entry}")
+                        result["metadata"]["limitations"].append(f"Permission denied: {entry.path}")
                     except Exception as e:
-                        result["metadata"]["limitations"].append(f"Error accessing {entry}: {str(e)}")
+                        result["metadata"]["limitations"].append(f"Error accessing {entry.path}: {str(e)}")
                         
             except PermissionError:
                 skipped_dirs.append(f"{path} (permission denied)")
@@ -543,10 +1045,32 @@ class FileSystemConnector:
             
             return dir_info
         
-        # Start traversal
+        def traverse_directory(root: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+            """Walk the tree with an explicit stack, yielding flat (relative path, info) records"""
+            # (path, relative path, depth); children are pushed in reverse so
+            # they pop in listing order, like a recursive walk
+            stack = [(root, "", 0)]
+            while stack:
+                path, rel, depth = stack.pop()
+                child_dirs: List[Tuple[Path, str]] = []
+                dir_info = scan_directory(path, rel, depth, child_dirs)
+                yield rel, dir_info
+                
+                if "file_count" in dir_info:
+                    for child, child_rel in reversed(child_dirs):
+                        stack.append((child, child_rel, depth + 1))
+        
+        # Start traversal, streaming one record per directory to disk
         try:
-            tree_info = traverse_directory(self.root_path)
-            result["discoveries"]["details"]["tree"] = tree_info
+            tree_path = self._get_tree_path()
+            tmp_path = tree_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                for rel, dir_info in traverse_directory(self.root_path):
+                    f.write(_JSON_COMPACT.encode({"path": rel, **dir_info}).encode() + b"\n")
+            os.replace(tmp_path, tree_path)
+            self._level_2_files = level_3_files
+            
+            result["discoveries"]["details"]["tree_file"] = str(tree_path)
             result["discoveries"]["summary"]["total_files"] = files_counted
             result["discoveries"]["summary"]["total_directories"] = dirs_counted
             result["discoveries"]["summary"]["max_depth_reached"] = max_depth
@@ -570,7 +1094,49 @@ class FileSystemConnector:
             self._save_cache("fs_level_2", result)
             self.discovery_level = 2
         
-        return result
+        return self._with_inline_tree(result)
+    
+    def _with_inline_tree(self, level_2: Dict[str, Any]) -> Dict[str, Any]:
+        """Level 2 result with "details.tree" filled in when inline_tree is set (never cached)"""
+        tree_file = level_2.get("discoveries", {}).get("details", {}).get("tree_file")
+        if not self.inline_tree or not tree_file or not Path(tree_file).exists():
+            return level_2
+        details = dict(level_2["discoveries"]["details"], tree=self._read_structure_tree(Path(tree_file)))
+        return dict(level_2, discoveries=dict(level_2["discoveries"], details=details))
+    
+    def load_structure_tree(self) -> Dict[str, Any]:
+        """Assemble the nested Level 2 directory tree from its streamed records
+        
+        Runs Level 2 discovery first if no tree has been written this session.
+        """
+        tree_path = self._get_tree_path()
+        if not tree_path.exists():
+            self.discover_level_2()
+            if not tree_path.exists():
+                return {}
+        return self._read_structure_tree(tree_path)
+    
+    @staticmethod
+    def _read_structure_tree(tree_path: Path) -> Dict[str, Any]:
+        """Nest the per-directory records of a streamed tree file"""
+        tree: Dict[str, Any] = {}
+        nodes: Dict[str, Dict[str, Any]] = {}
+        with open(tree_path, "rb") as f:
+            # Records are in walk order, so parents always precede children
+            for line in f:
+                record = json.loads(line)
+                rel = record.pop("path")
+                if "file_count" in record:
+                    record["subdirs"] = {}
+                
+                parent_rel, _, name = rel.rpartition("/")
+                if not rel:
+                    tree = record
+                elif not record.get("skipped") and parent_rel in nodes:
+                    nodes[parent_rel]["subdirs"][name] = record
+                nodes[rel] = record
+        
+        return tree
     
     def discover_level_3(self) -> Dict[str, Any]:
         """Level 3: File metadata and content sampling"""
@@ -587,7 +1153,7 @@ class FileSystemConnector:
         cached = self._get_cached_data("fs_level_3")
         if cached:
             cached["from_cache"] = True
-            return cached
+            return self._with_files_view(cached)
         
         result = {
             "metadata": {
@@ -607,109 +1173,184 @@ class FileSystemConnector:
                     "file_types": {},
                     "largest_files": [],
                     "newest_files": [],
+                    "newest_files_modified": [],
                     "files_analyzed": 0,
                     "files_hashed": 0,
                     "content_sampled": 0
                 },
                 "details": {
-                    "files": {}
+                    # Column-oriented file table; see file_details() for a per-file view
+                    "file_columns": {name: [] for name in ("path",) + self.FILE_COLUMNS}
                 }
             }
         }
         
         # Collect detailed file information
-        all_files = []
+        # Bounded min-heaps of (key, -sequence, path) holding the current top 10;
+        # the negated sequence keeps earlier files first on ties, like a stable sort
+        largest_heap = []
+        newest_heap = []
         files_analyzed = 0
         files_hashed = 0
         content_sampled = 0
         total_size = 0
         file_types = {}
+        candidates = []  # (path, relative path, stat or None to re-stat) to inspect
         
-        def analyze_files(path: Path, depth: int = 0):
-            nonlocal files_analyzed, files_hashed, content_sampled, total_size
-            
-            if depth > self.MAX_DEPTH:
-                return
-            
+        def collect_directory(path: Path, rel: str, child_dirs: List[Tuple[Path, str]]) -> bool:
+            """Collect files in one directory; returns False once the file limit is hit"""
             try:
-                for entry in path.iterdir():
-                    if entry.is_symlink():
+                with os.scandir(path) as it:
+                    entries = list(it)
+                
+                for dir_entry in entries:
+                    if dir_entry.is_symlink():
                         continue
                     
-                    if entry.is_file() and not self._respect_ignore_patterns(entry):
+                    # Relative path built from the walk prefix, no Path.relative_to()
+                    entry_rel = f"{rel}/{dir_entry.name}" if rel else dir_entry.name
+                    if dir_entry.is_file(follow_symlinks=False) and not self._is_ignored_rel(entry_rel):
                         try:
-                            stat = entry.stat()
-                            file_info = {
-                                "size_bytes": stat.st_size,
-                                "permissions": oct(stat.st_mode),
-                                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                                "type": self._detect_file_type(entry),
-                                "git_status": self._get_git_status(entry)  # Add git status
-                            }
-                            
-                            # Track file types
-                            ext = entry.suffix.lower()
-                            file_types[ext] = file_types.get(ext, 0) + 1
-                            
-                            # Calculate hash for smaller files (but respect privacy)
-                            if stat.st_size < self.MAX_FILE_SIZE_FULL_READ:
-                                hash_result = self._calculate_file_hash(entry)
-                                file_info["hash"] = hash_result
-                                if hash_result != "skipped:privacy":
-                                    files_hashed += 1
-                            
-                            # Sample content if appropriate
-                            if self._should_read_content(entry) and file_info["type"].startswith("text/"):
-                                if stat.st_size > self.MAX_FILE_SIZE_FULL_READ:
-                                    file_info["content_sample"] = self._sample_large_file(entry)
-                                else:
-                                    try:
-                                        content = entry.read_text(encoding='utf-8', errors='ignore')
-                                        file_info["content_preview"] = content[:500]
-                                    except:
-                                        pass
-                                content_sampled += 1
-                            
-                            # Store file info
-                            rel_path = str(entry.relative_to(self.root_path))
-                            result["discoveries"]["details"]["files"][rel_path] = file_info
-                            
-                            # Track for summary
-                            all_files.append({
-                                "path": rel_path,
-                                "size": stat.st_size,
-                                "modified": stat.st_mtime
-                            })
-                            
-                            files_analyzed += 1
-                            total_size += stat.st_size
-                            
-                            # Limit detailed analysis
-                            if files_analyzed >= 1000:
-                                result["metadata"]["limitations"].append("Limited to analyzing first 1000 files")
-                                return
-                                
+                            # Single cached stat reused for size, mode and mtime
+                            candidates.append((Path(dir_entry.path), entry_rel, dir_entry.stat(follow_symlinks=False)))
                         except Exception as e:
-                            result["metadata"]["limitations"].append(f"Error analyzing {entry}: {str(e)}")
+                            result["metadata"]["limitations"].append(f"Error analyzing {dir_entry.path}: {str(e)}")
+                            continue
+                        
+                        # Limit detailed analysis
+                        if len(candidates) >= self.MAX_FILES_ANALYZED:
+                            result["metadata"]["limitations"].append(f"Limited to analyzing first {self.MAX_FILES_ANALYZED} files")
+                            return False
                     
-                    elif entry.is_dir() and not self._respect_ignore_patterns(entry):
-                        analyze_files(entry, depth + 1)
+                    elif dir_entry.is_dir(follow_symlinks=False) and not self._is_ignored_rel(entry_rel):
+                        child_dirs.append((Path(dir_entry.path), entry_rel))
                         
             except PermissionError:
                 result["metadata"]["limitations"].append(f"Permission denied: {path}")
             except Exception as e:
                 result["metadata"]["limitations"].append(f"Error in {path}: {str(e)}")
+            
+            return True
+        
+        def collect_files(root: Path) -> None:
+            """Walk the tree with an explicit stack instead of recursion"""
+            stack = [(root, "", 0)]
+            while stack:
+                path, rel, depth = stack.pop()
+                if depth > self.MAX_DEPTH:
+                    continue
+                
+                child_dirs: List[Tuple[Path, str]] = []
+                if not collect_directory(path, rel, child_dirs):
+                    return
+                stack.extend((child, child_rel, depth + 1) for child, child_rel in reversed(child_dirs))
+        
+        def inspect_file(entry: Path, stat: os.stat_result) -> Dict[str, Any]:
+            """Type detection, hashing and content sampling for one file (runs in a worker thread)"""
+            file_info = {
+                "size_bytes": stat.st_size,
+                "permissions": oct(stat.st_mode),
+                "modified": stat.st_mtime,  # Epoch seconds; only the newest files get ISO strings
+                "type": self._detect_file_type(entry),
+                "git_status": self._get_git_status(entry)  # Add git status
+            }
+            
+            # Calculate hash for smaller files (but respect privacy)
+            if stat.st_size < self.MAX_FILE_SIZE_FULL_READ:
+                file_info["hash"] = self._cached_file_hash(entry, stat)
+            
+            # Sample content if appropriate
+            if self._should_read_content(entry, stat.st_size) and file_info["type"].startswith("text/"):
+                if stat.st_size > self.MAX_FILE_SIZE_FULL_READ:
+                    file_info["content_sample"] = self._sample_large_file(entry)
+                else:
+                    try:
+                        file_info["content_preview"] = self._read_preview(entry)
+                    except:
+                        pass
+            
+            return file_info
+        
+        def safe_inspect_file(candidate):
+            entry, _, stat = candidate
+            try:
+                if stat is None:
+                    # Taken from the Level 2 walk, which may be older than the file
+                    stat = os.stat(entry, follow_symlinks=False)
+                return inspect_file(entry, stat), stat, None
+            except Exception as e:
+                return None, None, e
+        
+        def track_top(heap: List[tuple], item: tuple, limit: int = 10) -> None:
+            if len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        
+        def analyze_files(root: Path) -> None:
+            """Walk the tree, then inspect the collected files on a thread pool"""
+            nonlocal files_analyzed, files_hashed, content_sampled, total_size
+            
+            if self._level_2_files is not None:
+                # Level 2 walked this tree in this session; take its file list, once
+                candidates.extend((path, rel_path, None) for path, rel_path in self._level_2_files)
+                self._level_2_files = None
+                if len(candidates) >= self.MAX_FILES_ANALYZED:
+                    result["metadata"]["limitations"].append(f"Limited to analyzing first {self.MAX_FILES_ANALYZED} files")
+            else:
+                collect_files(root)
+            if not candidates:
+                return
+            if self._file_hashes is None:
+                self._file_hashes = self._load_file_hashes()
+            
+            # Hashing and file reads release the GIL, so threads overlap the IO;
+            # map() keeps results in walk order
+            columns = result["discoveries"]["details"]["file_columns"]
+            workers = min(self.hash_workers, len(candidates))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                inspected = executor.map(safe_inspect_file, candidates)
+                
+                for (entry, rel_path, _), (file_info, stat, error) in zip(candidates, inspected):
+                    if error is not None:
+                        result["metadata"]["limitations"].append(f"Error analyzing {entry}: {str(error)}")
+                        continue
+                    
+                    # Track file types
+                    ext = entry.suffix.lower()
+                    file_types[ext] = file_types.get(ext, 0) + 1
+                    
+                    if file_info.get("hash", "skipped:privacy") != "skipped:privacy":
+                        files_hashed += 1
+                    if "content_preview" in file_info or "content_sample" in file_info:
+                        content_sampled += 1
+                    
+                    # Store file info, one value per column (None where absent)
+                    columns["path"].append(rel_path)
+                    for name in self.FILE_COLUMNS:
+                        columns[name].append(file_info.get(name))
+                    
+                    # Track for summary
+                    track_top(largest_heap, (stat.st_size, -files_analyzed, rel_path))
+                    track_top(newest_heap, (stat.st_mtime, -files_analyzed, rel_path))
+                    
+                    files_analyzed += 1
+                    total_size += stat.st_size
         
         # Start analysis
         try:
             analyze_files(self.root_path)
+            self._save_file_hashes()
             
-            # Sort for largest and newest files
-            all_files.sort(key=lambda x: x["size"], reverse=True)
-            result["discoveries"]["summary"]["largest_files"] = [f["path"] for f in all_files[:10]]
+            # Largest and newest files, ordered from the bounded heaps
+            largest = sorted(largest_heap, reverse=True)
+            result["discoveries"]["summary"]["largest_files"] = [path for _, _, path in largest]
             
-            all_files.sort(key=lambda x: x["modified"], reverse=True)
-            result["discoveries"]["summary"]["newest_files"] = [f["path"] for f in all_files[:10]]
+            newest = sorted(newest_heap, reverse=True)
+            result["discoveries"]["summary"]["newest_files"] = [path for _, _, path in newest]
+            result["discoveries"]["summary"]["newest_files_modified"] = [
+                datetime.fromtimestamp(mtime).isoformat() for mtime, _, _ in newest
+            ]
             
             # Update summary
             result["discoveries"]["summary"]["total_size_bytes"] = total_size
@@ -738,13 +1379,27 @@ class FileSystemConnector:
             self._save_cache("fs_level_3", result)
             self.discovery_level = 3
         
-        return result
+        return self._with_files_view(result)
+    
+    def _with_files_view(self, level_3: Dict[str, Any]) -> Dict[str, Any]:
+        """Level 3 result with the per-file "details.files" of earlier versions, as a
+        lazy view of file_columns (never cached)"""
+        columns = level_3["discoveries"]["details"]["file_columns"]
+        details = dict(level_3["discoveries"]["details"], files=_FileDetailsView(columns, self.FILE_COLUMNS))
+        return dict(level_3, discoveries=dict(level_3["discoveries"], details=details))
+    
+    @classmethod
+    def file_details(cls, level_3: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Per-file view {path: {field: value}} of a Level 3 result's column-oriented file table"""
+        columns = level_3.get("discoveries", {}).get("details", {}).get("file_columns", {})
+        return dict(_FileDetailsView(columns, cls.FILE_COLUMNS))
     
     def capture_snapshot(self, discovery_level: int = 3) -> Dict[str, Any]:
         """Capture a snapshot at the specified discovery level (adapted from Supabase)"""
+        now_iso = datetime.now().isoformat()
         snapshot = {
-            "snapshot_id": hashlib.md5(f"{self.session_id}-{datetime.now().isoformat()}".encode()).hexdigest()[:8],
-            "timestamp": datetime.now().isoformat(),
+            "snapshot_id": hashlib.blake2b(f"{self.session_id}-{now_iso}".encode(), digest_size=4).hexdigest(),
+            "timestamp": now_iso,
             "root_path": str(self.root_path),
             "discovery_level": discovery_level,
             "state": {},
@@ -758,21 +1413,24 @@ class FileSystemConnector:
             
         if discovery_level >= 2:
             level_2 = self.discover_level_2()
-            snapshot["state"]["structure"] = level_2.get("discoveries", {}).get("details", {}).get("tree", {})
+            snapshot["state"]["structure"] = self.load_structure_tree() if "error" not in level_2 else {}
             snapshot["statistics"]["files_scanned"] = level_2.get("discoveries", {}).get("summary", {}).get("total_files", 0)
             snapshot["statistics"]["directories_scanned"] = level_2.get("discoveries", {}).get("summary", {}).get("total_directories", 0)
             
         if discovery_level >= 3:
             level_3 = self.discover_level_3()
-            snapshot["state"]["metadata"] = level_3.get("discoveries", {}).get("details", {}).get("files", {})
-            snapshot["state"]["hashes"] = {}
-            for file_path, file_info in snapshot["state"]["metadata"].items():
-                if "hash" in file_info:
-                    snapshot["state"]["hashes"][file_path] = file_info["hash"]
+            snapshot["state"]["metadata"] = self.file_details(level_3)
+            columns = level_3.get("discoveries", {}).get("details", {}).get("file_columns", {})
+            snapshot["state"]["hashes"] = {
+                file_path: file_hash
+                for file_path, file_hash in zip(columns.get("path", []), columns.get("hash", []))
+                if file_hash is not None
+            }
         
-        # Save snapshot
+        # Save snapshot, streamed straight to the file as compact JSON
         snapshot_path = self.snapshots_dir / f"fs_snapshot_{snapshot['snapshot_id']}.json"
-        snapshot_path.write_text(json.dumps(snapshot, indent=2))
+        with snapshot_path.open("w", encoding="utf-8") as f:
+            f.writelines(_JSON_COMPACT.iterencode(snapshot))
         
         return snapshot
     
@@ -799,25 +1457,28 @@ class FileSystemConnector:
         old_hashes = old_snapshot.get("state", {}).get("hashes", {})
         new_hashes = new_snapshot.get("state", {}).get("hashes", {})
         
-        old_paths = set(old_hashes.keys())
-        new_paths = set(new_hashes.keys())
-        
-        # Files added/removed
-        result["change_detection"]["changes"]["files_added"] = list(new_paths - old_paths)
-        result["change_detection"]["changes"]["files_removed"] = list(old_paths - new_paths)
+        # Files added/removed (dict key views support set algebra without copying)
+        changes = result["change_detection"]["changes"]
+        changes["files_added"] = list(new_hashes.keys() - old_hashes.keys())
+        changes["files_removed"] = list(old_hashes.keys() - new_hashes.keys())
         
-        # Files modified
-        for path in old_paths & new_paths:
-            if old_hashes[path] != new_hashes[path]:
-                result["change_detection"]["changes"]["files_modified"].append(path)
+        # Files modified: one lookup per old path
+        modified = changes["files_modified"]
+        for path, old_hash in old_hashes.items():
+            new_hash = new_hashes.get(path)
+            if new_hash is not None and new_hash != old_hash:
+                modified.append(path)
         
         # Calculate size changes
         old_metadata = old_snapshot.get("state", {}).get("metadata", {})
         new_metadata = new_snapshot.get("state", {}).get("metadata", {})
         
-        old_size = sum(f.get("size_bytes", 0) for f in old_metadata.values())
-        new_size = sum(f.get("size_bytes", 0) for f in new_metadata.values())
-        result["change_detection"]["changes"]["total_size_change_bytes"] = new_size - old_size
+        size_change = 0
+        for info in new_metadata.values():
+            size_change += info.get("size_bytes", 0)
+        for info in old_metadata.values():
+            size_change -= info.get("size_bytes", 0)
+        changes["total_size_change_bytes"] = size_change
         
         return result
     
@@ -831,6 +1492,10 @@ class FileSystemConnector:
             return self.discover_level_3()
         else:
             return {"error": f"Invalid discovery level: {level}. Must be 1-3"}
+    
+    async def discover_async(self, level: int = 1) -> Dict[str, Any]:
+        """discover() for asyncio callers; the blocking walk runs in a worker thread"""
+        return await asyncio.to_thread(self.discover, level)
 
 
 def main():
@@ -846,11 +1511,18 @@ def main():
                        help="Capture a snapshot at the specified level")
     parser.add_argument("--no-cache", action="store_true",
                        help="Bypass cache and force fresh discovery")
+    parser.add_argument("--hash-algo", type=str, default=None,
+                       help="Change-detection hash (default: sha256; blake2b_128, or xxh3_64/blake3 if installed)")
+    parser.add_argument("--inline-tree", action="store_true",
+                       help="Include the nested directory tree in Level 2 output (details.tree)")
+    parser.add_argument("--hash-workers", type=int, default=None,
+                       help=f"Level 3 file inspection threads (default: {FileSystemConnector.MAX_WORKERS})")
     
     args = parser.parse_args()
     
     try:
-        connector = FileSystemConnector(root_path=args.root)
+        connector = FileSystemConnector(root_path=args.root, hash_algo=args.hash_algo,
+                                        hash_workers=args.hash_workers, inline_tree=args.inline_tree)
         
         if args.no_cache:
             # Clear cache for this session
@@ -858,20 +1530,25 @@ def main():
                 cache_path = connector._get_cache_path(cache_type)
                 if cache_path.exists():
                     cache_path.unlink()
+            # Stored per-file hashes too: rehash every file, then store the fresh hashes
+            connector._get_file_hashes_path().unlink(missing_ok=True)
+            connector._file_hashes = {}
         
         if args.snapshot:
             result = connector.capture_snapshot(discovery_level=args.level)
             print(f"Snapshot captured: {result['snapshot_id']}")
         else:
             result = connector.discover(level=args.level)
-        
-        print(json.dumps(result, indent=2))
+
+        # Stream the (possibly large) result instead of building one string
+        sys.stdout.writelines(_JSON_PRETTY.iterencode(result))
+        sys.stdout.write("\n")
         
     except Exception as e:
-        print(json.dumps({
+        print(_JSON_PRETTY.encode({
             "error": str(e),
             "timestamp": datetime.now().isoformat()
-        }, indent=2))
+        }))
         sys.exit(1)
 
 
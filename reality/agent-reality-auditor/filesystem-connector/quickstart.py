@@ -4,13 +4,37 @@ File System Reality Agent - Quick Start Validation
 Validates environment and provides estimates before full discovery
 """
 
+import bisect
 import os
+import random
+import re
 import sys
 import time
+import shutil
 import subprocess
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+_GB = 1 / (1024**3)  # Bytes to gigabytes
+
+# Directories the scope estimate reports as skipped instead of counting
+_SKIP_DIRS = frozenset(("node_modules", ".git", "venv", ".env", "__pycache__"))
+
+# Recommended discovery level by estimated file count: under 100 files full
+# discovery (3), under 1000 structure and basic metadata (2), else access check (1)
+_LEVEL_THRESHOLDS = (100, 1000)
+_LEVELS = (3, 2, 1)
+
+# Substrings that mark a file name as sensitive, matched case-insensitively in one pass
+_SENSITIVE_PATTERNS = (
+    ".env", ".env.local", ".env.production",
+    "id_rsa", "id_dsa", "id_ecdsa",
+    ".key", ".pem", ".p12",
+    "credentials", "secrets",
+    ".keychain", ".keystore"
+)
+_SENSITIVE_RE = re.compile("|".join(map(re.escape, _SENSITIVE_PATTERNS)), re.IGNORECASE)
+
 class FileSystemQuickStart:
     """Quick validation and estimation for File System Agent"""
     
@@ -20,6 +44,8 @@ class FileSystemQuickStart:
             self.root_path = Path(root_path).resolve()
         else:
             self.root_path = Path.cwd()
+        
+        self._git_info: Optional[Dict[str, Any]] = None  # Cached check_git_availability() result
     
     def check_basic_access(self) -> Dict[str, Any]:
         """Test basic file system access"""
@@ -38,9 +64,10 @@ class FileSystemQuickStart:
             if result["root_exists"] and result["is_directory"]:
                 result["can_read"] = os.access(self.root_path, os.R_OK)
                 
-                # Try to list contents
+                # Try to list contents (reading one entry answers the question)
                 try:
-                    list(self.root_path.iterdir())
+                    with os.scandir(self.root_path) as it:
+                        next(it, None)
                     result["can_list"] = True
                 except PermissionError:
                     result["can_list"] = False
@@ -49,52 +76,83 @@ class FileSystemQuickStart:
         
         return result
     
-    def estimate_scope(self) -> Dict[str, Any]:
-        """Estimate the scope of discovery"""
+    def estimate_scope(self, sample_size: int = 32, max_entries: int = 256) -> Dict[str, Any]:
+        """Estimate the scope of discovery
+        
+        With more than sample_size top-level directories, only a random sample of
+        them is probed (at most max_entries entries each) and the counts are
+        extrapolated; "sampled" is then True in the result.
+        """
         result = {
             "estimated_files": 0,
             "estimated_directories": 0,
             "large_directories": [],
             "problematic_patterns": [],
             "estimated_time_seconds": 0,
-            "recommended_level": 1
+            "recommended_level": 1,
+            "sampled": False
         }
         
         file_count = 0
         dir_count = 0
         large_dirs = []
         problems = []
+        top_dirs = []
         
         # Quick sample of top-level directories
         try:
-            for entry in self.root_path.iterdir():
-                if entry.is_symlink():
-                    continue
-                    
-                if entry.is_dir():
+            with os.scandir(self.root_path) as it:
+                entries = list(it)
+            for entry in entries:
+                # Top-level symlinks are not counted: they fail both type checks
+                if entry.is_dir(follow_symlinks=False):
                     dir_count += 1
-                    dir_name = entry.name
                     
                     # Check for known problematic patterns
-                    if dir_name in ["node_modules", ".git", "venv", ".env", "__pycache__"]:
-                        problems.append(f"{dir_name} (will be skipped)")
-                        continue
-                    
-                    # Quick count of subdirectory
-                    try:
-                        subentries = list(entry.iterdir())
-                        if len(subentries) > 100:
-                            large_dirs.append(f"{dir_name} ({len(subentries)} items)")
-                        file_count += sum(1 for e in subentries if e.is_file())
-                        dir_count += sum(1 for e in subentries if e.is_dir())
-                    except PermissionError:
-                        problems.append(f"{dir_name} (permission denied)")
-                    except:
-                        pass
+                    if entry.name in _SKIP_DIRS:
+                        problems.append(f"{entry.name} (will be skipped)")
+                    else:
+                        top_dirs.append(entry)
                         
-                elif entry.is_file():
+                elif entry.is_file(follow_symlinks=False):
                     file_count += 1
             
+            # Probe every directory, or a bounded random sample of very wide trees
+            sampled = len(top_dirs) > sample_size
+            probe_dirs = random.sample(top_dirs, sample_size) if sampled else top_dirs
+            sub_files = 0
+            sub_dirs = 0
+            
+            for entry in probe_dirs:
+                # Quick count of subdirectory (DirEntry type checks stat only symlinks)
+                try:
+                    count = 0
+                    with os.scandir(entry.path) as sub:
+                        for e in sub:
+                            if sampled and count >= max_entries:
+                                break
+                            count += 1
+                            if e.is_file():
+                                sub_files += 1
+                            elif e.is_dir():
+                                sub_dirs += 1
+                    if count > 100:
+                        more = "+" if sampled and count >= max_entries else ""
+                        large_dirs.append(f"{entry.name} ({count}{more} items)")
+                except PermissionError:
+                    problems.append(f"{entry.name} (permission denied)")
+                except:
+                    pass
+            
+            # Extrapolate sampled counts to all top-level directories
+            if sampled:
+                scale = len(top_dirs) / len(probe_dirs)
+                sub_files = round(sub_files * scale)
+                sub_dirs = round(sub_dirs * scale)
+            file_count += sub_files
+            dir_count += sub_dirs
+            result["sampled"] = sampled
+            
             # Rough estimates (multiply by depth factor)
             depth_factor = 3  # Assume average depth of 3
             result["estimated_files"] = file_count * depth_factor
@@ -106,12 +164,7 @@ class FileSystemQuickStart:
             result["estimated_time_seconds"] = max(1, result["estimated_files"] / 1000)
             
             # Recommend discovery level based on size
-            if result["estimated_files"] < 100:
-                result["recommended_level"] = 3  # Full discovery for small projects
-            elif result["estimated_files"] < 1000:
-                result["recommended_level"] = 2  # Structure and basic metadata
-            else:
-                result["recommended_level"] = 1  # Start with basic access check
+            result["recommended_level"] = _LEVELS[bisect.bisect_right(_LEVEL_THRESHOLDS, result["estimated_files"])]
                 
         except Exception as e:
             result["error"] = str(e)
@@ -120,34 +173,35 @@ class FileSystemQuickStart:
     
     def check_git_availability(self) -> Dict[str, bool]:
         """Check if git is available and this is a git repository"""
+        if self._git_info is not None:
+            return dict(self._git_info)
+        
         result = {
             "git_installed": False,
             "is_git_repo": False,
             "git_root": None
         }
         
-        # Check if git is installed
-        try:
-            subprocess.run(["git", "--version"], capture_output=True, check=True)
-            result["git_installed"] = True
-        except:
-            return result
-        
-        # Check if we're in a git repository
+        # One rev-parse answers both questions: it only fails to start when git
+        # is missing, and exits non-zero outside a repository
         try:
             git_result = subprocess.run(
                 ["git", "rev-parse", "--show-toplevel"],
                 capture_output=True,
                 text=True,
-                cwd=self.root_path,
-                check=True
+                cwd=self.root_path
             )
-            result["is_git_repo"] = True
-            result["git_root"] = git_result.stdout.strip()
-        except:
-            pass
+        except OSError:
+            git_result = None
         
-        return result
+        if git_result is not None:
+            result["git_installed"] = True
+            if git_result.returncode == 0:
+                result["is_git_repo"] = True
+                result["git_root"] = git_result.stdout.strip()
+        
+        self._git_info = result
+        return dict(result)
     
     def check_disk_space(self) -> Dict[str, Any]:
         """Check available disk space"""
@@ -159,19 +213,11 @@ class FileSystemQuickStart:
         }
         
         try:
-            if hasattr(os, 'statvfs'):
-                # Unix/Linux
-                stat = os.statvfs(self.root_path)
-                result["available_gb"] = (stat.f_bavail * stat.f_frsize) / (1024**3)
-                result["total_gb"] = (stat.f_blocks * stat.f_frsize) / (1024**3)
-            else:
-                # Windows
-                import shutil
-                total, used, free = shutil.disk_usage(self.root_path)
-                result["available_gb"] = free / (1024**3)
-                result["total_gb"] = total / (1024**3)
-            
-            result["used_percent"] = ((result["total_gb"] - result["available_gb"]) / result["total_gb"]) * 100
+            # statvfs on Unix, GetDiskFreeSpaceEx on Windows
+            total, used, free = shutil.disk_usage(self.root_path)
+            result["available_gb"] = free * _GB
+            result["total_gb"] = total * _GB
+            result["used_percent"] = 100.0 * used / total if total else 0.0
             result["sufficient_space"] = result["available_gb"] > 0.1  # Need at least 100MB for cache
             
         except Exception as e:
@@ -187,24 +233,15 @@ class FileSystemQuickStart:
             "safe_to_proceed": True
         }
         
-        sensitive_patterns = [
-            ".env", ".env.local", ".env.production",
-            "id_rsa", "id_dsa", "id_ecdsa",
-            ".key", ".pem", ".p12",
-            "credentials", "secrets",
-            ".keychain", ".keystore"
-        ]
-        
         try:
             # Only check top-level for quick scan
-            for entry in self.root_path.iterdir():
-                if entry.is_file():
-                    name_lower = entry.name.lower()
-                    for pattern in sensitive_patterns:
-                        if pattern in name_lower:
-                            result["sensitive_files_found"].append(entry.name)
-                            result["warnings"].append(f"Found sensitive file: {entry.name} (will not read content)")
-                            break
+            with os.scandir(self.root_path) as it:
+                entries = list(it)
+            for entry in entries:
+                # Symlinked key and .env files are reported like regular ones
+                if entry.is_file() and _SENSITIVE_RE.search(entry.name):
+                    result["sensitive_files_found"].append(entry.name)
+                    result["warnings"].append(f"Found sensitive file: {entry.name} (will not read content)")
             
             # Still safe to proceed, we just won't read these files
             result["safe_to_proceed"] = True
@@ -371,7 +408,8 @@ def main():
     result = quickstart.run()
     
     if args.json:
-        print(json.dumps(result, indent=2))
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
     else:
         quickstart.print_summary(result)
     
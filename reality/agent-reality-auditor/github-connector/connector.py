@@ -5,16 +5,114 @@ Implements SPEC-003: GitHub State Discovery
 Constitutional compliance: Article VII (transparency through version control)
 """
 
+import asyncio
+import hashlib
 import subprocess
 import json
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
 from pathlib import Path
-import argparse
 import time
 
+# REST/GraphQL endpoint used directly with the gh CLI's github.com token
+GITHUB_HOST = "github.com"
+API_HOST = "api.github.com"
+
+def _discovery_pipe_size() -> int:
+    """Pipe buffer for discovery commands: 1 MiB, capped at what an unprivileged
+    process may request; -1 (the 64 KiB default) where the limit is unknown"""
+    try:
+        with open("/proc/sys/fs/pipe-max-size") as f:
+            return min(1 << 20, int(f.read()))
+    except (OSError, ValueError):
+        return -1
+
+# Large gh outputs (run lists, the GraphQL fallback) drain in a few reads;
+# subprocess only accepts pipesize from Python 3.10
+_PIPE_KWARGS = {"pipesize": _discovery_pipe_size()} if sys.version_info >= (3, 10) else {}
+
+# Environment variables that move the repository or add config (GIT_CONFIG covers
+# GIT_CONFIG_GLOBAL, GIT_CONFIG_SYSTEM, GIT_CONFIG_NOSYSTEM, GIT_CONFIG_COUNT, ...)
+_GIT_DISCOVERY_ENV = ("GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR", "GIT_CEILING_DIRECTORIES",
+                      "GIT_DISCOVERY_ACROSS_FILESYSTEM", "GIT_CONFIG")
+
+# Lowercased config text the .git reader cannot model: includes and includeIf,
+# URL rewriting, reftable refs and a relocated work tree
+_GIT_CONFIG_MARKERS = ("[include", "insteadof", "refstorage", "worktree")
+
+# "Token scopes: 'repo', 'workflow'" line of `gh auth status`
+_SCOPES_RE = re.compile(r"Token scopes:(.*)")
+
+# owner/name of an HTTPS or SSH remote, with or without ".git" and a trailing slash
+_GH_URL_RE = re.compile(r"github\.com[:/]+([^/]+)/([^/]+?)(?:\.git)?/?\s*$")
+_PR_NUM_RE = re.compile(r"/pull/(\d+)")
+_ISSUE_NUM_RE = re.compile(r"/issues/(\d+)")
+
+def _safe_json(text: str) -> Any:
+    """Parse gh JSON output; None for empty, non-JSON or malformed output"""
+    text = text.lstrip()
+    if text[:1] not in ("{", "["):
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+# Output of gh commands that cannot change within a process (version, auth
+# status, token), keyed by the environment that selects the gh account
+# plus the command. Only successful runs are memoized.
+_GH_ACCOUNT_ENV = ("GH_TOKEN", "GITHUB_TOKEN", "GH_HOST", "GH_CONFIG_DIR")
+_gh_identity_cache: Dict[Tuple[str, ...], Tuple[int, str, str]] = {}
+
+def _identity_key(cmd: List[str]) -> Tuple[str, ...]:
+    return tuple(os.environ.get(name, "") for name in _GH_ACCOUNT_ENV) + tuple(cmd)
+
+# Levels 3 and 4 in one round trip; aliases name the fields the gh CLI queries
+# would return. Actions runs and workflows are not in the GraphQL schema.
+DISCOVERY_QUERY = """
+query($owner: String!, $name: String!, $assigned: String!) {
+  repository(owner: $owner, name: $name) {
+    openPRs: pullRequests(states: OPEN, first: 10, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes { number title state author { login } createdAt }
+    }
+    mergedPRs: pullRequests(states: MERGED, first: 5, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes { number title mergedAt author { login } }
+    }
+    openIssues: issues(states: OPEN, first: 20, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        number title state author { login } createdAt
+        assignees(first: 5) { nodes { login } }
+        labels(first: 10) { nodes { name } }
+      }
+    }
+    closedIssues: issues(states: CLOSED, first: 10, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes { number title closedAt author { login } }
+    }
+    labels(first: 50) { nodes { name description color } }
+  }
+  assignedIssues: search(query: $assigned, type: ISSUE, first: 20) {
+    nodes {
+      ... on Issue {
+        number title state author { login } createdAt
+        assignees(first: 5) { nodes { login } }
+        labels(first: 10) { nodes { name } }
+      }
+    }
+  }
+}
+"""
+
+REPO_VIEW_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) { visibility isFork parent { nameWithOwner } }
+}
+"""
+
 class GitHubRealityAgent:
     """
     Progressive discovery of GitHub repository state.
@@ -29,20 +127,31 @@ class GitHubRealityAgent:
         5: 0.6      # Workflow/CI state
     }
     
+    # Seconds a completed discovery is reused for the same HEAD, branch and gh account
+    DISCOVERY_CACHE_TTL = 60
+    
     def __init__(self, repo_path: str = ".", verbose: bool = False):
         self.repo_path = Path(repo_path).resolve()
+        self._repo_path_str = os.fspath(self.repo_path)  # cwd for every git/gh command
+        self.cache_dir = Path(__file__).parent / ".cache"
         self.verbose = verbose
         self.gh_available = False
         self.authenticated = False
         self.repo_info = {}
+        self.repo_connected = False  # Authenticated and Level 2 found the repository (gates levels 3-5)
+        self.repo_slug = None  # "owner/name" once Level 2 has found the repository
+        self._graphql_task = None  # Batched Level 3/4 query, shared while discover() runs
+        self._gh_token = None  # `gh auth token`, fetched on first API request ("" if unavailable)
+        self._http_idle = []  # Kept-alive HTTPS connections to API_HOST, one per in-flight request
+        self._http_lock = threading.Lock()  # Guards the token fetch and the idle list
         self.discovery_timestamp = datetime.now().isoformat()
         self.confidence_scores = {}
         
     def log(self, message: str, level: str = "INFO"):
         """Constitutional logging requirement"""
         if self.verbose:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            print(f"[{timestamp}] [{level}] {message}")
+            t = time.localtime()
+            print(f"[{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}] [{level}] {message}")
     
     def run_command(self, cmd: List[str], check: bool = True) -> Tuple[int, str, str]:
         """Execute command and return (returncode, stdout, stderr)"""
@@ -50,16 +159,291 @@ class GitHubRealityAgent:
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True,
                 check=check,
-                cwd=self.repo_path
+                cwd=self._repo_path_str
             )
-            return result.returncode, result.stdout, result.stderr
+            # Decode once, like run_command_async; invalid UTF-8 must not
+            # turn a successful command into a failure
+            return (result.returncode, result.stdout.decode("utf-8", "replace"),
+                    result.stderr.decode("utf-8", "replace"))
         except subprocess.CalledProcessError as e:
-            return e.returncode, e.stdout, e.stderr
+            return e.returncode, e.stdout.decode("utf-8", "replace"), e.stderr.decode("utf-8", "replace")
+        except FileNotFoundError as e:
+            return 127, "", str(e)  # The shell's "command not found" status
+        except Exception as e:
+            return -1, "", str(e)
+    
+    async def run_command_async(self, cmd: List[str]) -> Tuple[int, str, str]:
+        """Execute command without blocking the event loop; returns (returncode, stdout, stderr)"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,  # Discovery queries never prompt
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self._repo_path_str,
+                **_PIPE_KWARGS
+            )
+            stdout, stderr = await proc.communicate()
+            return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
         except Exception as e:
             return -1, "", str(e)
     
+    def run_identity_command(self, cmd: List[str]) -> Tuple[int, str, str]:
+        """run_command for gh identity queries, memoized per process once they succeed"""
+        key = _identity_key(cmd)
+        cached = _gh_identity_cache.get(key)
+        if cached is None:
+            cached = self.run_command(cmd, check=False)
+            if cached[0] == 0:
+                _gh_identity_cache[key] = cached
+        return cached
+    
+    def _api_request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Call the GitHub API over one kept-alive HTTPS connection, authenticated with
+        the gh CLI's token. Returns the parsed JSON body, or None on any failure."""
+        import http.client  # Only needed once discovery talks to the API
+        
+        # The token is requested for github.com only; gh resolves any other
+        # host (GH_HOST, Enterprise logins) itself in the callers' fallbacks
+        if os.environ.get("GH_HOST", GITHUB_HOST) != GITHUB_HOST:
+            return None
+        with self._http_lock:
+            if self._gh_token is None:
+                returncode, stdout, stderr = self.run_identity_command(
+                    ["gh", "auth", "token", "--hostname", GITHUB_HOST])
+                self._gh_token = stdout.strip() if returncode == 0 else ""
+            if not self._gh_token:
+                return None
+            connection = self._http_idle.pop() if self._http_idle else None
+        
+        headers = {
+            "Authorization": f"Bearer {self._gh_token}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "edl-github-reality-agent"
+        }
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers["Content-Type"] = "application/json"
+        try:
+            if connection is None:
+                connection = http.client.HTTPSConnection(API_HOST, timeout=30)
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.log(f"API request {method} {path} failed: {e}", "WARNING")
+            if connection is not None:
+                connection.close()
+            return None
+        
+        # Fully read, so the connection can serve the next request
+        with self._http_lock:
+            self._http_idle.append(connection)
+        if response.status != 200:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+    
+    async def _graphql_discover(self) -> Optional[Dict[str, Any]]:
+        """Fetch the Level 3/4 lists in one GraphQL query; None if it fails"""
+        owner, name = self.repo_slug.split("/", 1)
+        # Issues assigned to the token's user, filtered by GitHub search
+        assigned = f"repo:{self.repo_slug} is:issue is:open assignee:@me sort:created-desc"
+        response = await asyncio.to_thread(
+            self._api_request, "POST", "/graphql",
+            {"query": DISCOVERY_QUERY, "variables": {"owner": owner, "name": name, "assigned": assigned}}
+        )
+        if response is None:
+            # Let gh handle hosts and auth setups a direct request cannot
+            returncode, stdout, stderr = await self.run_command_async(
+                ["gh", "api", "graphql", "-f", f"query={DISCOVERY_QUERY}",
+                 "-f", f"owner={owner}", "-f", f"name={name}", "-f", f"assigned={assigned}"]
+            )
+            if returncode != 0:
+                self.log(f"GraphQL discovery failed, using per-query calls: {stderr.strip()}", "WARNING")
+                return None
+        try:
+            if response is None:
+                response = json.loads(stdout)
+            repo = response["data"]["repository"]
+            if response.get("errors") or repo is None:
+                raise ValueError(response.get("errors"))
+            
+            # Flatten connections into the shapes `gh ... --json` returns
+            assigned_issues = response["data"]["assignedIssues"]["nodes"]
+            for issue in repo["openIssues"]["nodes"] + assigned_issues:
+                issue["assignees"] = issue["assignees"]["nodes"]
+                issue["labels"] = issue["labels"]["nodes"]
+            return {
+                "open_prs": repo["openPRs"]["nodes"],
+                "merged_prs": repo["mergedPRs"]["nodes"],
+                "open_issues": repo["openIssues"]["nodes"],
+                "closed_issues": repo["closedIssues"]["nodes"],
+                "labels": repo["labels"]["nodes"],
+                "assigned_issues": assigned_issues
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            self.log(f"GraphQL discovery returned errors, using per-query calls: {e}", "WARNING")
+            return None
+    
+    async def _query(self, field: str, cmd: List[str], rest: Optional[Tuple[str, Any]] = None) -> Any:
+        """One discovery query: taken from the batched GraphQL result when available,
+        else from a direct REST request if `rest` gives (path, convert), else its own
+        command. Returns None if the command fails."""
+        if self._graphql_task is not None:
+            batched = await self._graphql_task
+            if batched is not None and field in batched:
+                return batched[field]
+        
+        if rest is not None and self.repo_slug:
+            path, convert = rest
+            response = await asyncio.to_thread(self._api_request, "GET", f"/repos/{self.repo_slug}{path}")
+            if response is not None:
+                return convert(response)
+        
+        returncode, stdout, stderr = await self.run_command_async(cmd)
+        if returncode != 0:
+            return None
+        return _safe_json(stdout)
+    
+    def _fast_git_state(self) -> Optional[Tuple[bool, Optional[str], Optional[str]]]:
+        """(is_git_repo, origin URL, default branch) read straight from .git, with no
+        git processes. None when git itself should answer: repository discovery or
+        config changed through GIT_* variables, no .git directory found below a
+        filesystem boundary, a linked worktree or submodule, a repository owned by
+        another user (safe.directory), reftable refs, or includes, URL rewriting or
+        core.worktree in the repository, system, global or XDG config."""
+        if any(name.startswith(_GIT_DISCOVERY_ENV) for name in os.environ):
+            return None
+        try:
+            device = self.repo_path.stat().st_dev
+            for directory in (self.repo_path, *self.repo_path.parents):
+                if directory.stat().st_dev != device:
+                    return None  # git stops at filesystem boundaries
+                git_dir = directory / ".git"
+                if git_dir.is_dir():
+                    break
+                if git_dir.exists():
+                    return None  # "gitdir:" file of a worktree or submodule
+            else:
+                return None
+            if (git_dir / "commondir").exists():
+                return None  # Administrative directory of a linked worktree
+            if hasattr(os, "geteuid") and directory.stat().st_uid != os.geteuid():
+                return None  # Only trusted through safe.directory
+        except OSError:
+            return None
+        
+        config_files = [git_dir / "config", Path("/etc/gitconfig"), Path.home() / ".gitconfig",
+                        Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config")) / "git" / "config"]
+        config_text = ""
+        for config_file in config_files:
+            try:
+                text = config_file.read_text(errors="replace")
+            except OSError:
+                continue
+            lowered = text.lower()
+            if any(marker in lowered for marker in _GIT_CONFIG_MARKERS):
+                return None
+            if config_file == config_files[0]:
+                config_text = text
+        
+        import configparser
+        
+        remote_url = None
+        config = configparser.RawConfigParser(strict=False)
+        try:
+            config.read_string(config_text)
+            remote_url = config.get('remote "origin"', "url", fallback=None)
+        except configparser.Error:
+            return None
+        if remote_url is not None and remote_url.startswith('"'):
+            return None  # Quoted values need git's own unescaping
+        
+        default_branch = None
+        try:
+            head = (git_dir / "refs" / "remotes" / "origin" / "HEAD").read_text().strip()
+            if head.startswith("ref: "):
+                default_branch = head.split('/')[-1]
+        except OSError:
+            pass
+        
+        return True, remote_url, default_branch
+    
+    def _git_state_from_commands(self) -> Tuple[bool, Optional[str], Optional[str]]:
+        """(is_git_repo, origin URL, default branch) from git commands"""
+        returncode, stdout, stderr = self.run_command(
+            ["git", "rev-parse", "--is-inside-work-tree"],
+            check=False
+        )
+        if returncode != 0:
+            return False, None, None
+        
+        remote_url = None
+        returncode, stdout, stderr = self.run_command(
+            ["git", "remote", "get-url", "origin"],
+            check=False
+        )
+        if returncode == 0:
+            remote_url = stdout.strip()
+        
+        default_branch = None
+        returncode, stdout, stderr = self.run_command(
+            ["git", "symbolic-ref", "refs/remotes/origin/HEAD"],
+            check=False
+        )
+        if returncode == 0:
+            default_branch = stdout.strip().split('/')[-1]
+        
+        return True, remote_url, default_branch
+    
+    def _repo_view(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Visibility and fork parent of a repository, in the shape of
+        `gh repo view --json visibility,isFork,parent`; None if it cannot be read"""
+        owner, name = slug.split("/", 1)
+        response = self._api_request(
+            "POST", "/graphql",
+            {"query": REPO_VIEW_QUERY, "variables": {"owner": owner, "name": name}}
+        )
+        data = response.get("data") if isinstance(response, dict) else None
+        if data and data.get("repository") is not None:
+            return data["repository"]
+        
+        returncode, stdout, stderr = self.run_command(
+            ["gh", "repo", "view", slug, "--json", "visibility,isFork,parent"],
+            check=False
+        )
+        if returncode != 0:
+            return None
+        return _safe_json(stdout)
+    
+    @staticmethod
+    def _runs_from_rest(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """REST workflow runs in the shape of `gh run list --json`"""
+        return [
+            {
+                "databaseId": run.get("id"),
+                "name": run.get("name"),
+                "status": run.get("status"),
+                "conclusion": run.get("conclusion"),
+                "createdAt": run.get("created_at"),
+                "headBranch": run.get("head_branch")
+            }
+            for run in response.get("workflow_runs", [])
+        ]
+    
+    @staticmethod
+    def _workflows_from_rest(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """REST workflows in the shape of `gh workflow list --json`"""
+        return [
+            {"name": workflow.get("name"), "state": workflow.get("state"), "id": workflow.get("id")}
+            for workflow in response.get("workflows", [])
+        ]
+    
     def level_1_github_cli_access(self) -> Dict[str, Any]:
         """Level 1: Verify GitHub CLI availability and authentication"""
         self.log("Starting Level 1: GitHub CLI access verification")
@@ -68,54 +452,53 @@ class GitHubRealityAgent:
             "level": 1,
             "confidence": 0.0,
             "gh_installed": False,
-            "gh_version": None,
             "authenticated": False,
             "auth_status": None,
             "token_scopes": [],
             "rate_limit": None
         }
         
-        # Check if gh is installed
-        returncode, stdout, stderr = self.run_command(["gh", "--version"], check=False)
-        if returncode == 0:
-            result["gh_installed"] = True
-            result["gh_version"] = stdout.strip().split('\n')[0]
-            self.gh_available = True
-            self.log(f"GitHub CLI found: {result['gh_version']}")
-        else:
+        # One gh launch answers both questions: auth status exits 1 when
+        # logged out, and only a failed launch means gh is missing
+        returncode, stdout, stderr = self.run_identity_command(["gh", "auth", "status"])
+        if returncode == 127:
             self.log("GitHub CLI not installed", "WARNING")
             return result
+        result["gh_installed"] = True
+        self.gh_available = True
         
-        # Check authentication status
-        returncode, stdout, stderr = self.run_command(["gh", "auth", "status"], check=False)
         if returncode == 0:
             result["authenticated"] = True
             result["auth_status"] = stdout
             self.authenticated = True
             
-            # Extract token scopes from output
-            for line in stdout.split('\n'):
-                if 'Token scopes:' in line:
-                    scopes = line.split(':', 1)[1].strip()
-                    result["token_scopes"] = [s.strip().strip("'") for s in scopes.split(',')]
+            # Extract token scopes from output (the active account is listed first)
+            match = _SCOPES_RE.search(stdout)
+            if match:
+                result["token_scopes"] = [s.strip().strip("'") for s in match.group(1).strip().split(',')]
             
             self.log("GitHub authentication confirmed")
         else:
             self.log("Not authenticated to GitHub", "WARNING")
             result["auth_status"] = stderr or "Not authenticated"
         
-        # Check API rate limit
+        # Check API rate limit: directly only when gh reports a github.com
+        # login, else through gh, which resolves the host (e.g. Enterprise)
         if result["authenticated"]:
-            returncode, stdout, stderr = self.run_command(
-                ["gh", "api", "rate_limit", "--jq", ".rate"],
-                check=False
-            )
-            if returncode == 0:
-                try:
-                    result["rate_limit"] = json.loads(stdout)
-                    self.log(f"API rate limit: {result['rate_limit'].get('remaining', 'unknown')}/{result['rate_limit'].get('limit', 'unknown')}")
-                except:
-                    pass
+            response = None
+            if f"Logged in to {GITHUB_HOST} " in result["auth_status"]:
+                response = self._api_request("GET", "/rate_limit")
+            if isinstance(response, dict):
+                rate_limit = response.get("rate")
+            else:
+                returncode, stdout, stderr = self.run_command(
+                    ["gh", "api", "rate_limit", "--jq", ".rate"],
+                    check=False
+                )
+                rate_limit = _safe_json(stdout) if returncode == 0 else None
+            if isinstance(rate_limit, dict):
+                result["rate_limit"] = rate_limit
+                self.log(f"API rate limit: {rate_limit.get('remaining', 'unknown')}/{rate_limit.get('limit', 'unknown')}")
         
         # Calculate confidence
         if result["gh_installed"]:
@@ -148,61 +531,46 @@ class GitHubRealityAgent:
             self.log("Skipping Level 2: Not authenticated", "WARNING")
             return result
         
+        # Git state from .git on disk, or from git itself for layouts the fast path skips
+        git_state = self._fast_git_state()
+        if git_state is None:
+            git_state = self._git_state_from_commands()
+        is_git_repo, remote_url, default_branch = git_state
+        
         # Check if current directory is a git repo
-        returncode, stdout, stderr = self.run_command(
-            ["git", "rev-parse", "--is-inside-work-tree"],
-            check=False
-        )
-        if returncode != 0:
+        if not is_git_repo:
             self.log("Not inside a git repository", "WARNING")
             return result
         
         result["is_git_repo"] = True
         
-        # Get remote URL
-        returncode, stdout, stderr = self.run_command(
-            ["git", "remote", "get-url", "origin"],
-            check=False
-        )
-        if returncode == 0:
+        # Remote URL
+        if remote_url is not None:
             result["has_remote"] = True
-            result["remote_url"] = stdout.strip()
+            result["remote_url"] = remote_url
             
             # Parse owner and repo from URL
-            url = result["remote_url"]
-            if "github.com" in url:
-                parts = url.split('/')
-                if len(parts) >= 2:
-                    result["repo_owner"] = parts[-2].split(':')[-1]
-                    result["repo_name"] = parts[-1].replace('.git', '')
-        
-        # Get default branch
-        returncode, stdout, stderr = self.run_command(
-            ["git", "symbolic-ref", "refs/remotes/origin/HEAD"],
-            check=False
-        )
-        if returncode == 0:
-            result["default_branch"] = stdout.strip().split('/')[-1]
+            match = _GH_URL_RE.search(remote_url)
+            if match:
+                result["repo_owner"], result["repo_name"] = match.group(1), match.group(2)
+        
+        # Default branch
+        if default_branch is not None:
+            result["default_branch"] = default_branch
         
         # Get repository info from GitHub API
         if result["repo_owner"] and result["repo_name"]:
-            returncode, stdout, stderr = self.run_command(
-                ["gh", "repo", "view", f"{result['repo_owner']}/{result['repo_name']}", "--json",
-                 "visibility,isFork,parent"],
-                check=False
-            )
-            if returncode == 0:
-                try:
-                    repo_data = json.loads(stdout)
-                    result["repo_visibility"] = repo_data.get("visibility")
-                    result["is_fork"] = repo_data.get("isFork", False)
-                    if result["is_fork"] and repo_data.get("parent"):
-                        result["parent_repo"] = repo_data["parent"].get("nameWithOwner")
-                    
-                    self.repo_info = repo_data
-                    self.log(f"Repository: {result['repo_owner']}/{result['repo_name']} ({result['repo_visibility']})")
-                except:
-                    pass
+            repo_data = self._repo_view(f"{result['repo_owner']}/{result['repo_name']}")
+            if repo_data is not None:
+                result["repo_visibility"] = repo_data.get("visibility")
+                result["is_fork"] = repo_data.get("isFork", False)
+                if result["is_fork"] and repo_data.get("parent"):
+                    result["parent_repo"] = repo_data["parent"].get("nameWithOwner")
+                
+                self.repo_info = repo_data
+                self.repo_connected = True
+                self.repo_slug = f"{result['repo_owner']}/{result['repo_name']}"
+                self.log(f"Repository: {result['repo_owner']}/{result['repo_name']} ({result['repo_visibility']})")
         
         # Calculate confidence
         if result["is_git_repo"]:
@@ -215,8 +583,31 @@ class GitHubRealityAgent:
         self.confidence_scores[2] = result["confidence"]
         return result
     
+    @staticmethod
+    def _run_sync(coro) -> Any:
+        """Run a coroutine to completion from sync code, on its own loop and
+        thread when the caller is already inside a running event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+    
     def level_3_pull_request_state(self) -> Dict[str, Any]:
         """Level 3: Discover pull request state"""
+        return self._run_sync(self.level_3_pull_request_state_async())
+    
+    def level_4_issue_tracking_state(self) -> Dict[str, Any]:
+        """Level 4: Discover issue tracking state"""
+        return self._run_sync(self.level_4_issue_tracking_state_async())
+    
+    def level_5_workflow_state(self) -> Dict[str, Any]:
+        """Level 5: Discover GitHub Actions workflow state"""
+        return self._run_sync(self.level_5_workflow_state_async())
+    
+    async def level_3_pull_request_state_async(self) -> Dict[str, Any]:
+        """Level 3 as a coroutine, so discover() can run it alongside levels 4 and 5"""
         self.log("Starting Level 3: Pull request state discovery")
         
         result = {
@@ -232,62 +623,44 @@ class GitHubRealityAgent:
             "recent_merged_prs": []
         }
         
-        if not self.authenticated or not self.repo_info:
+        if not self.repo_connected:
             self.log("Skipping Level 3: Prerequisites not met", "WARNING")
             return result
         
-        # Get current branch
-        returncode, stdout, stderr = self.run_command(
-            ["git", "branch", "--show-current"],
-            check=False
+        # Issue all four queries at once; the PR status is only used when on a branch
+        branch, pr_status, open_prs, merged_prs = await asyncio.gather(
+            self.run_command_async(["git", "branch", "--show-current"]),
+            self.run_command_async(["gh", "pr", "status", "--json", "currentBranch"]),
+            self._query("open_prs", ["gh", "pr", "list", "--limit", "10", "--json",
+                                     "number,title,state,author,createdAt"]),
+            self._query("merged_prs", ["gh", "pr", "list", "--state", "merged", "--limit", "5", "--json",
+                                       "number,title,mergedAt,author"])
         )
+        
+        # Get current branch
+        returncode, stdout, stderr = branch
         if returncode == 0:
             result["current_branch"] = stdout.strip()
             self.log(f"Current branch: {result['current_branch']}")
         
         # Check if current branch has PR
         if result["current_branch"]:
-            returncode, stdout, stderr = self.run_command(
-                ["gh", "pr", "status", "--json", "currentBranch"],
-                check=False
-            )
-            if returncode == 0:
-                try:
-                    pr_data = json.loads(stdout)
-                    current = pr_data.get("currentBranch")
-                    if current:
-                        result["pr_exists"] = True
-                        result["pr_number"] = current.get("number")
-                        result["pr_state"] = current.get("state")
-                        result["pr_url"] = current.get("url")
-                        self.log(f"PR #{result['pr_number']} ({result['pr_state']})")
-                except:
-                    pass
-        
-        # Get open PRs
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "pr", "list", "--limit", "10", "--json",
-             "number,title,state,author,createdAt"],
-            check=False
-        )
-        if returncode == 0:
-            try:
-                result["open_prs"] = json.loads(stdout)
-                self.log(f"Found {len(result['open_prs'])} open PRs")
-            except:
-                pass
+            returncode, stdout, stderr = pr_status
+            pr_data = _safe_json(stdout) if returncode == 0 else None
+            current = pr_data.get("currentBranch") if isinstance(pr_data, dict) else None
+            if current:
+                result["pr_exists"] = True
+                result["pr_number"] = current.get("number")
+                result["pr_state"] = current.get("state")
+                result["pr_url"] = current.get("url")
+                self.log(f"PR #{result['pr_number']} ({result['pr_state']})")
         
-        # Get recently merged PRs
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "pr", "list", "--state", "merged", "--limit", "5", "--json",
-             "number,title,mergedAt,author"],
-            check=False
-        )
-        if returncode == 0:
-            try:
-                result["recent_merged_prs"] = json.loads(stdout)
-            except:
-                pass
+        # Open and recently merged PRs
+        if open_prs is not None:
+            result["open_prs"] = open_prs
+            self.log(f"Found {len(result['open_prs'])} open PRs")
+        if merged_prs is not None:
+            result["recent_merged_prs"] = merged_prs
         
         # Calculate confidence
         if result["current_branch"]:
@@ -298,8 +671,8 @@ class GitHubRealityAgent:
         self.confidence_scores[3] = result["confidence"]
         return result
     
-    def level_4_issue_tracking_state(self) -> Dict[str, Any]:
-        """Level 4: Discover issue tracking state"""
+    async def level_4_issue_tracking_state_async(self) -> Dict[str, Any]:
+        """Level 4 as a coroutine"""
         self.log("Starting Level 4: Issue tracking state discovery")
         
         result = {
@@ -312,57 +685,35 @@ class GitHubRealityAgent:
             "labels": []
         }
         
-        if not self.authenticated or not self.repo_info:
+        if not self.repo_connected:
             self.log("Skipping Level 4: Prerequisites not met", "WARNING")
             return result
         
-        # Get open issues
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "issue", "list", "--limit", "20", "--json",
-             "number,title,state,author,assignees,labels,createdAt"],
-            check=False
-        )
-        if returncode == 0:
-            try:
-                result["open_issues"] = json.loads(stdout)
-                result["open_issues_count"] = len(result["open_issues"])
-                self.log(f"Found {result['open_issues_count']} open issues")
-                
-                # Extract assigned issues
-                current_user_cmd = ["gh", "api", "user", "--jq", ".login"]
-                user_code, user_out, _ = self.run_command(current_user_cmd, check=False)
-                if user_code == 0:
-                    current_user = user_out.strip()
-                    result["assigned_issues"] = [
-                        issue for issue in result["open_issues"]
-                        if any(a.get("login") == current_user for a in issue.get("assignees", []))
-                    ]
-            except:
-                pass
-        
-        # Get recently closed issues
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "issue", "list", "--state", "closed", "--limit", "10", "--json",
-             "number,title,closedAt,author"],
-            check=False
+        # Issue all four queries at once; GitHub filters the assigned issues
+        open_issues, assigned_issues, closed_issues, labels = await asyncio.gather(
+            self._query("open_issues", ["gh", "issue", "list", "--limit", "20", "--json",
+                                        "number,title,state,author,assignees,labels,createdAt"]),
+            self._query("assigned_issues", ["gh", "issue", "list", "--assignee", "@me", "--limit", "20", "--json",
+                                            "number,title,state,author,assignees,labels,createdAt"]),
+            self._query("closed_issues", ["gh", "issue", "list", "--state", "closed", "--limit", "10", "--json",
+                                          "number,title,closedAt,author"]),
+            self._query("labels", ["gh", "label", "list", "--limit", "50", "--json", "name,description,color"])
         )
-        if returncode == 0:
-            try:
-                result["recent_closed_issues"] = json.loads(stdout)
-            except:
-                pass
         
-        # Get labels
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "label", "list", "--limit", "50", "--json", "name,description,color"],
-            check=False
-        )
-        if returncode == 0:
-            try:
-                result["labels"] = json.loads(stdout)
-                self.log(f"Found {len(result['labels'])} labels")
-            except:
-                pass
+        # Get open issues
+        if open_issues is not None:
+            result["open_issues"] = open_issues
+            result["open_issues_count"] = len(open_issues)
+            self.log(f"Found {result['open_issues_count']} open issues")
+        
+        # Assigned, recently closed issues and labels
+        if assigned_issues is not None:
+            result["assigned_issues"] = assigned_issues
+        if closed_issues is not None:
+            result["recent_closed_issues"] = closed_issues
+        if labels is not None:
+            result["labels"] = labels
+            self.log(f"Found {len(result['labels'])} labels")
         
         # Calculate confidence
         if result["open_issues_count"] > 0 or len(result["recent_closed_issues"]) > 0:
@@ -373,8 +724,8 @@ class GitHubRealityAgent:
         self.confidence_scores[4] = result["confidence"]
         return result
     
-    def level_5_workflow_state(self) -> Dict[str, Any]:
-        """Level 5: Discover GitHub Actions workflow state"""
+    async def level_5_workflow_state_async(self) -> Dict[str, Any]:
+        """Level 5 as a coroutine"""
         self.log("Starting Level 5: Workflow/CI state discovery")
         
         result = {
@@ -386,48 +737,45 @@ class GitHubRealityAgent:
             "workflow_files": []
         }
         
-        if not self.authenticated or not self.repo_info:
+        if not self.repo_connected:
             self.log("Skipping Level 5: Prerequisites not met", "WARNING")
             return result
         
         # Check for workflow files locally
         workflows_dir = self.repo_path / ".github" / "workflows"
-        if workflows_dir.exists():
-            result["workflow_files"] = [
-                f.name for f in workflows_dir.glob("*.yml")
-            ] + [
-                f.name for f in workflows_dir.glob("*.yaml")
-            ]
+        try:
+            # One directory read; DirEntry types come from the listing, no per-file stat
+            with os.scandir(workflows_dir) as entries:
+                result["workflow_files"] = [
+                    entry.name for entry in entries
+                    if entry.name.endswith((".yml", ".yaml")) and entry.is_file(follow_symlinks=False)
+                ]
             self.log(f"Found {len(result['workflow_files'])} workflow files")
+        except (FileNotFoundError, NotADirectoryError):
+            pass
         
-        # Get workflow runs
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "run", "list", "--limit", "10", "--json",
-             "databaseId,name,status,conclusion,createdAt,headBranch"],
-            check=False
+        # Runs and workflows are independent queries
+        runs, workflows = await asyncio.gather(
+            self._query("recent_runs", ["gh", "run", "list", "--limit", "10", "--json",
+                                        "databaseId,name,status,conclusion,createdAt,headBranch"],
+                        rest=("/actions/runs?per_page=10", self._runs_from_rest)),
+            self._query("workflows", ["gh", "workflow", "list", "--all", "--json", "name,state,id"],
+                        rest=("/actions/workflows?per_page=100", self._workflows_from_rest))
         )
-        if returncode == 0:
-            try:
-                result["recent_runs"] = json.loads(stdout)
-                result["active_runs"] = [
-                    run for run in result["recent_runs"]
-                    if run.get("status") in ["in_progress", "queued"]
-                ]
-                self.log(f"Found {len(result['recent_runs'])} recent workflow runs")
-            except:
-                pass
+        
+        # Get workflow runs
+        if runs is not None:
+            result["recent_runs"] = runs
+            result["active_runs"] = [
+                run for run in runs
+                if run.get("status") in ["in_progress", "queued"]
+            ]
+            self.log(f"Found {len(result['recent_runs'])} recent workflow runs")
         
         # Get workflow list
-        returncode, stdout, stderr = self.run_command(
-            ["gh", "workflow", "list", "--all", "--json", "name,state,id"],
-            check=False
-        )
-        if returncode == 0:
-            try:
-                result["workflows"] = json.loads(stdout)
-                self.log(f"Found {len(result['workflows'])} workflows")
-            except:
-                pass
+        if workflows is not None:
+            result["workflows"] = workflows
+            self.log(f"Found {len(result['workflows'])} workflows")
         
         # Calculate confidence
         if len(result["workflows"]) > 0:
@@ -466,8 +814,9 @@ class GitHubRealityAgent:
             result["success"] = True
             result["pr_url"] = stdout.strip()
             # Extract PR number from URL
-            if "/pull/" in result["pr_url"]:
-                result["pr_number"] = int(result["pr_url"].split("/pull/")[-1])
+            match = _PR_NUM_RE.search(result["pr_url"])
+            if match:
+                result["pr_number"] = int(match.group(1))
             self.log(f"Created PR: {result['pr_url']}")
         else:
             result["error"] = stderr or "Failed to create PR"
@@ -501,8 +850,9 @@ class GitHubRealityAgent:
             result["success"] = True
             result["issue_url"] = stdout.strip()
             # Extract issue number from URL
-            if "/issues/" in result["issue_url"]:
-                result["issue_number"] = int(result["issue_url"].split("/issues/")[-1])
+            match = _ISSUE_NUM_RE.search(result["issue_url"])
+            if match:
+                result["issue_number"] = int(match.group(1))
             self.log(f"Created issue: {result['issue_url']}")
         else:
             result["error"] = stderr or "Failed to create issue"
@@ -556,10 +906,72 @@ class GitHubRealityAgent:
         
         return result
     
-    def discover(self, max_level: int = 5) -> Dict[str, Any]:
+    async def _discovery_cache_path(self, max_level: int) -> Optional[Path]:
+        """Cache file for this checkout's HEAD and branch, the gh account and max_level;
+        None outside a git checkout"""
+        returncode, stdout, stderr = await self.run_command_async(
+            ["git", "rev-parse", "HEAD", "--abbrev-ref", "HEAD"]
+        )
+        if returncode != 0:
+            return None
+        
+        # gh rewrites hosts.yml on login, logout and account switches
+        config_dir = os.environ.get("GH_CONFIG_DIR") or os.path.join(
+            os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "gh")
+        try:
+            hosts_mtime = os.stat(os.path.join(config_dir, "hosts.yml")).st_mtime_ns
+        except OSError:
+            hosts_mtime = 0
+        
+        key = "|".join([self._repo_path_str, stdout.strip(), *_identity_key([]), str(hosts_mtime), str(max_level)])
+        return self.cache_dir / f"discovery_{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+    
+    def _load_discovery_cache(self, cache_path: Path) -> Optional[Dict[str, Any]]:
+        """Cached discovery results if written within DISCOVERY_CACHE_TTL, restoring agent state"""
+        try:
+            if time.time() - os.stat(cache_path).st_mtime > self.DISCOVERY_CACHE_TTL:
+                return None
+            with open(cache_path, encoding="utf-8") as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if "repo_state" not in results:
+            return None  # Written before the repository state was stored with it
+        
+        # JSON object keys are strings; levels are numbered
+        results["levels"] = {int(level): data for level, data in results["levels"].items()}
+        results["from_cache"] = True
+        return results
+    
+    def _save_discovery_cache(self, cache_path: Path, results: Dict[str, Any]) -> None:
+        """Write discovery results atomically; a failed write only costs the next run a rediscovery.
+        Level 1 (auth status output, token scopes, rate limit) is never written: it is rerun.
+        The repository state Level 2 left on the agent is stored with the levels."""
+        cached = dict(results, levels={level: data for level, data in results["levels"].items() if level != 1},
+                      repo_state={"repo_connected": self.repo_connected, "repo_slug": self.repo_slug,
+                                  "repo_info": self.repo_info})
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cached, f, default=str)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            self.log(f"Could not write discovery cache: {e}", "WARNING")
+    
+    def discover(self, max_level: int = 5, use_cache: bool = True) -> Dict[str, Any]:
         """Run progressive discovery up to specified level"""
+        return self._run_sync(self.discover_async(max_level, use_cache))
+    
+    async def discover_async(self, max_level: int = 5, use_cache: bool = True) -> Dict[str, Any]:
+        """Progressive discovery; levels 3-5 only depend on levels 1-2, so they run concurrently.
+        A completed discovery is reused for DISCOVERY_CACHE_TTL seconds unless use_cache is False."""
         self.log(f"Starting GitHub Reality discovery (max level: {max_level})")
         
+        cache_path = await self._discovery_cache_path(max_level) if use_cache else None
+        cached = self._load_discovery_cache(cache_path) if cache_path is not None else None
+        
         results = {
             "discovery_timestamp": self.discovery_timestamp,
             "repo_path": str(self.repo_path),
@@ -567,9 +979,10 @@ class GitHubRealityAgent:
             "overall_confidence": 0.0
         }
         
-        # Level 1: GitHub CLI Access
+        # Level 1: GitHub CLI Access (Levels 1-2 block on gh/git and HTTPS, so they
+        # run on a worker thread and leave the caller's event loop free)
         if max_level >= 1:
-            results["levels"][1] = self.level_1_github_cli_access()
+            results["levels"][1] = await asyncio.to_thread(self.level_1_github_cli_access)
             if results["levels"][1]["confidence"] == 0:
                 self.log("Cannot proceed without GitHub CLI", "ERROR")
                 # Still calculate overall confidence even if we stop
@@ -578,21 +991,40 @@ class GitHubRealityAgent:
                 results["discovery_complete"] = False
                 return results
         
+        # Levels 2-5 from the cache, behind a fresh Level 1
+        if cached is not None and self.authenticated:
+            self.log("Using cached discovery results for levels 2-5")
+            cached["levels"][1] = results["levels"][1]
+            # Leave the agent as connected as a full Level 2 would
+            repo_state = cached.pop("repo_state")
+            self.repo_connected = repo_state["repo_connected"]
+            self.repo_slug = repo_state["repo_slug"]
+            self.repo_info = repo_state["repo_info"]
+            self.confidence_scores = {level: data.get("confidence", 0.0) for level, data in cached["levels"].items()}
+            cached["overall_confidence"] = sum(self.confidence_scores.values()) / len(self.confidence_scores)
+            return cached
+        
         # Level 2: Repository Connection
         if max_level >= 2 and self.authenticated:
-            results["levels"][2] = self.level_2_repository_connection()
+            results["levels"][2] = await asyncio.to_thread(self.level_2_repository_connection)
         
-        # Level 3: Pull Request State
-        if max_level >= 3 and self.authenticated:
-            results["levels"][3] = self.level_3_pull_request_state()
-        
-        # Level 4: Issue Tracking State
-        if max_level >= 4 and self.authenticated:
-            results["levels"][4] = self.level_4_issue_tracking_state()
-        
-        # Level 5: Workflow State
-        if max_level >= 5 and self.authenticated:
-            results["levels"][5] = self.level_5_workflow_state()
+        # Levels 3-5: Pull Request, Issue Tracking and Workflow State
+        if self.authenticated:
+            # Levels 3 and 4 read their lists from one batched GraphQL query
+            if max_level >= 3 and self.repo_slug:
+                self._graphql_task = asyncio.ensure_future(self._graphql_discover())
+            levels = [
+                (3, self.level_3_pull_request_state_async),
+                (4, self.level_4_issue_tracking_state_async),
+                (5, self.level_5_workflow_state_async)
+            ]
+            levels = [(level, method) for level, method in levels if max_level >= level]
+            try:
+                level_results = await asyncio.gather(*(method() for _, method in levels))
+            finally:
+                self._graphql_task = None
+            for (level, _), level_result in zip(levels, level_results):
+                results["levels"][level] = level_result
         
         # Calculate overall confidence
         if self.confidence_scores:
@@ -603,10 +1035,15 @@ class GitHubRealityAgent:
         results["discovery_complete"] = True
         self.log(f"Discovery complete. Overall confidence: {results['overall_confidence']:.2f}")
         
+        if cache_path is not None:
+            self._save_discovery_cache(cache_path, results)
+        
         return results
 
 
 def main():
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="GitHub Reality Agent - Progressive Discovery"
     )
@@ -635,6 +1072,11 @@ def main():
         default="text",
         help="Output format"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached discovery results and query GitHub again"
+    )
     parser.add_argument(
         "--create-pr",
         action="store_true",
@@ -652,7 +1094,7 @@ def main():
     agent = GitHubRealityAgent(args.path, args.verbose)
     
     # Run discovery
-    results = agent.discover(args.level)
+    results = agent.discover(args.level, use_cache=not args.no_cache)
     
     # Output results
     if args.output == "json":
@@ -670,7 +1112,7 @@ def main():
             print(f"Confidence: {level_data.get('confidence', 0):.2%}")
             
             if level_num == 1:
-                print(f"GitHub CLI: {level_data.get('gh_version', 'Not installed')}")
+                print(f"GitHub CLI: {'Installed' if level_data.get('gh_installed') else 'Not installed'}")
                 print(f"Authenticated: {level_data.get('authenticated', False)}")
                 if level_data.get('token_scopes'):
                     print(f"Token Scopes: {', '.join(level_data['token_scopes'])}")
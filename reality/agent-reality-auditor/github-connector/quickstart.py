@@ -5,16 +5,53 @@ Checks prerequisites and estimates discovery scope
 """
 
 import subprocess
+import hashlib
 import json
 import os
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+# Probes with no dependencies on each other; run() issues them all at once
+GIT_PROBES = {
+    "git_version": ["git", "--version"],
+    "git_repo": ["git", "rev-parse", "--is-inside-work-tree"],
+    "git_remote": ["git", "remote", "get-url", "origin"]
+}
+GH_PROBES = {
+    # Also tells whether gh is installed: it exits 1 when logged out
+    "gh_auth": ["gh", "auth", "status"]
+}
+
+# Rate limit and repository permission in one request once gh is authenticated
+BOOTSTRAP_QUERY = """
+query($owner: String!, $name: String!) {
+  rateLimit { remaining limit resetAt }
+  viewer { login }
+  repository(owner: $owner, name: $name) { viewerPermission defaultBranchRef { name } isPrivate isFork }
+}
+"""
+RATE_LIMIT_QUERY = "{ rateLimit { remaining limit resetAt } viewer { login } }"
+
+# Seconds a successful result may be reused across runs; everything else
+# (work tree, remote) is cheap and local, so it is always re-checked
+CACHE_TTL = {
+    "git_version": 86400,
+    "gh_auth": 300,
+    "bootstrap": 300
+}
+
+# "Token scopes: 'repo', 'workflow'" line of `gh auth status`
+_SCOPES_RE = re.compile(r"Token scopes:(.*)")
+_GH_URL_RE = re.compile(r"github\.com[:/]+([^/]+)/([^/]+?)(?:\.git)?/?\s*$")
 
 class GitHubQuickstart:
     """Validate GitHub CLI setup and estimate discovery scope"""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.checks = {
             "git_installed": False,
             "git_repo": False,
@@ -27,6 +64,11 @@ class GitHubQuickstart:
         }
         self.warnings = []
         self.recommendations = []
+        self.repo_slug: Optional[Tuple[str, str]] = None
+        self._bootstrap: Optional[Dict] = None
+        self.cache_dir = Path(__file__).parent / ".cache"
+        self.cache_path = self._cache_path() if use_cache else None
+        self._cache = self._load_cache()
         
     def run_command(self, cmd: List[str]) -> Tuple[int, str, str]:
         """Execute command safely"""
@@ -34,21 +76,108 @@ class GitHubQuickstart:
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True,
                 timeout=5
             )
-            return result.returncode, result.stdout, result.stderr
+            # Decode once; gh output under an odd locale may not be valid UTF-8
+            return (result.returncode, result.stdout.decode("utf-8", "replace"),
+                    result.stderr.decode("utf-8", "replace"))
         except subprocess.TimeoutExpired:
             return -1, "", "Command timed out"
+        except FileNotFoundError as e:
+            return 127, "", str(e)  # The shell's "command not found" status
         except Exception as e:
             return -1, "", str(e)
     
-    def check_git(self) -> bool:
+    def run_commands(self, commands: Dict[str, List[str]]) -> Dict[str, Tuple[int, str, str]]:
+        """Execute independent commands concurrently, keyed like `commands`"""
+        with ThreadPoolExecutor(max_workers=len(commands) or 1) as executor:
+            futures = {key: executor.submit(self.run_command, cmd) for key, cmd in commands.items()}
+            return {key: future.result() for key, future in futures.items()}
+    
+    def _cache_path(self) -> Path:
+        """Cache file for this directory and gh credentials"""
+        # gh rewrites hosts.yml on login, logout and account switches
+        config_dir = os.environ.get("GH_CONFIG_DIR") or os.path.join(
+            os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "gh")
+        try:
+            hosts_mtime = os.stat(os.path.join(config_dir, "hosts.yml")).st_mtime_ns
+        except OSError:
+            hosts_mtime = 0
+        
+        key = "\0".join([os.getcwd(), os.environ.get("GH_TOKEN", ""),
+                         os.environ.get("GITHUB_TOKEN", ""), str(hosts_mtime)])
+        return self.cache_dir / f"quickstart_{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+    
+    def _load_cache(self) -> Dict:
+        """Cache entries from the last run, {} if there are none"""
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+    
+    def _cached(self, name: str, remote: Optional[str] = None):
+        """Value stored under `name` if it is within its TTL and was read for `remote`"""
+        entry = self._cache.get(name)
+        if (not entry or name not in CACHE_TTL or entry.get("remote") != remote
+                or time.time() - entry.get("ts", 0) > CACHE_TTL[name]):
+            return None
+        return entry.get("value")
+    
+    def _remember(self, name: str, value, remote: Optional[str] = None) -> None:
+        """Store a successful result for the next run"""
+        self._cache[name] = {"ts": time.time(), "remote": remote, "value": value}
+    
+    def _save_cache(self) -> None:
+        """Write cache entries atomically; a failed write only costs the next run its commands"""
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+    
+    def probe(self, commands: Dict[str, List[str]]) -> Dict[str, Tuple[int, str, str]]:
+        """run_commands(), reusing cached results and caching successful ones"""
+        results = {}
+        pending = {}
+        for key, cmd in commands.items():
+            cached = self._cached(key)
+            if cached is not None:
+                results[key] = tuple(cached)
+            else:
+                pending[key] = cmd
+        
+        for key, result in self.run_commands(pending).items():
+            results[key] = result
+            if key in CACHE_TTL and result[0] == 0:
+                self._remember(key, self._cacheable(key, result))
+        return results
+    
+    @staticmethod
+    def _cacheable(key: str, result: Tuple[int, str, str]) -> List:
+        """The part of a probe result that may be written to disk: for gh auth
+        status only the exit status and token scopes, never account or token lines"""
+        if key == "gh_auth":
+            match = _SCOPES_RE.search(result[1])
+            return [result[0], f"Token scopes:{match.group(1)}" if match else "", ""]
+        return list(result)
+    
+    def check_git(self, results: Optional[Dict[str, Tuple[int, str, str]]] = None) -> bool:
         """Check git installation and repository"""
+        if results is None:
+            results = self.run_commands(GIT_PROBES)
         print("🔍 Checking git installation...")
         
         # Check git installed
-        code, out, err = self.run_command(["git", "--version"])
+        code, out, err = results["git_version"]
         if code == 0:
             self.checks["git_installed"] = True
             print(f"  ✓ Git installed: {out.strip()}")
@@ -58,7 +187,7 @@ class GitHubQuickstart:
             return False
         
         # Check if in git repo
-        code, out, err = self.run_command(["git", "rev-parse", "--is-inside-work-tree"])
+        code, out, err = results["git_repo"]
         if code == 0:
             self.checks["git_repo"] = True
             print("  ✓ Inside git repository")
@@ -68,14 +197,16 @@ class GitHubQuickstart:
             return False
         
         # Check for remote
-        code, out, err = self.run_command(["git", "remote", "get-url", "origin"])
+        code, out, err = results["git_remote"]
         if code == 0:
             self.checks["has_remote"] = True
             remote_url = out.strip()
             print(f"  ✓ Has remote: {remote_url}")
             
-            if "github.com" in remote_url:
+            match = _GH_URL_RE.search(remote_url)
+            if match:
                 self.checks["remote_is_github"] = True
+                self.repo_slug = match.group(1), match.group(2)
                 print("  ✓ Remote is GitHub")
             else:
                 print("  ⚠ Remote is not GitHub")
@@ -86,16 +217,17 @@ class GitHubQuickstart:
         
         return True
     
-    def check_github_cli(self) -> bool:
+    def check_github_cli(self, results: Optional[Dict[str, Tuple[int, str, str]]] = None) -> bool:
         """Check GitHub CLI installation and auth"""
+        if results is None:
+            results = self.run_commands(GH_PROBES)
         print("\n🔍 Checking GitHub CLI...")
         
         # Check gh installed
-        code, out, err = self.run_command(["gh", "--version"])
-        if code == 0:
+        code, out, err = results["gh_auth"]
+        if code != 127:
             self.checks["gh_installed"] = True
-            version = out.strip().split('\n')[0]
-            print(f"  ✓ GitHub CLI installed: {version}")
+            print("  ✓ GitHub CLI installed")
         else:
             print("  ✗ GitHub CLI not installed")
             self.recommendations.append(
@@ -104,23 +236,22 @@ class GitHubQuickstart:
             return False
         
         # Check authentication
-        code, out, err = self.run_command(["gh", "auth", "status"])
         if code == 0:
             self.checks["gh_authenticated"] = True
             print("  ✓ Authenticated to GitHub")
             
-            # Check scopes
-            for line in out.split('\n'):
-                if 'Token scopes:' in line:
-                    scopes = line.split(':', 1)[1].strip()
-                    print(f"  ✓ Token scopes: {scopes}")
-                    
-                    # Check for required scopes
-                    if 'repo' in scopes:
-                        self.checks["can_create_pr"] = True
-                        self.checks["can_create_issue"] = True
-                    else:
-                        self.warnings.append("Token missing 'repo' scope for full functionality")
+            # Check scopes (the active account is listed first)
+            match = _SCOPES_RE.search(out)
+            if match:
+                scopes = match.group(1).strip()
+                print(f"  ✓ Token scopes: {scopes}")
+                
+                # Check for required scopes
+                if 'repo' in scopes:
+                    self.checks["can_create_pr"] = True
+                    self.checks["can_create_issue"] = True
+                else:
+                    self.warnings.append("Token missing 'repo' scope for full functionality")
         else:
             print("  ✗ Not authenticated")
             self.recommendations.append("Authenticate: gh auth login")
@@ -128,6 +259,32 @@ class GitHubQuickstart:
         
         return True
     
+    def _graphql_bootstrap(self) -> Dict:
+        """Rate limit, viewer and (on a GitHub remote) repository permission
+        from a single `gh api graphql` call; {} if it fails. Fetched once."""
+        remote = "/".join(self.repo_slug) if self.repo_slug else None
+        if self._bootstrap is None:
+            self._bootstrap = self._cached("bootstrap", remote)
+        if self._bootstrap is None:
+            if self.repo_slug:
+                owner, name = self.repo_slug
+                cmd = ["gh", "api", "graphql", "-f", f"query={BOOTSTRAP_QUERY}",
+                       "-f", f"owner={owner}", "-f", f"name={name}"]
+            else:
+                cmd = ["gh", "api", "graphql", "-f", f"query={RATE_LIMIT_QUERY}"]
+            # gh exits non-zero on partial errors (e.g. no access to the
+            # repository) but still prints whatever data resolved
+            code, out, err = self.run_command(cmd)
+            try:
+                self._bootstrap = json.loads(out).get("data") or {}
+            except (ValueError, AttributeError):
+                self._bootstrap = {}
+            if self._bootstrap:
+                # The viewer's login is not needed again; keep it off the disk
+                self._remember("bootstrap", {key: value for key, value in self._bootstrap.items()
+                                             if key != "viewer"}, remote)
+        return self._bootstrap
+    
     def check_api_limits(self) -> Dict:
         """Check GitHub API rate limits"""
         print("\n🔍 Checking API rate limits...")
@@ -136,24 +293,18 @@ class GitHubQuickstart:
             print("  ⚠ Skipping (not authenticated)")
             return {}
         
-        code, out, err = self.run_command(
-            ["gh", "api", "rate_limit", "--jq", ".rate"]
-        )
+        limits = self._graphql_bootstrap().get("rateLimit")
         
-        if code == 0:
-            try:
-                limits = json.loads(out)
-                remaining = limits.get("remaining", 0)
-                limit = limits.get("limit", 0)
-                
-                print(f"  ✓ API calls remaining: {remaining}/{limit}")
-                
-                if remaining < 100:
-                    self.warnings.append(f"Low API rate limit: {remaining} calls remaining")
-                
-                return limits
-            except:
-                print("  ⚠ Could not parse rate limits")
+        if limits:
+            remaining = limits.get("remaining", 0)
+            limit = limits.get("limit", 0)
+            
+            print(f"  ✓ API calls remaining: {remaining}/{limit}")
+            
+            if remaining < 100:
+                self.warnings.append(f"Low API rate limit: {remaining} calls remaining")
+            
+            return limits
         else:
             print("  ⚠ Could not check rate limits")
         
@@ -205,25 +356,19 @@ class GitHubQuickstart:
             print("  ⚠ Cannot check (not connected to GitHub)")
             return
         
-        # Try to get repo info
-        code, out, err = self.run_command(
-            ["gh", "repo", "view", "--json", "viewerPermission"]
-        )
+        # Repository info comes with the rate limit query
+        repository = self._graphql_bootstrap().get("repository")
         
-        if code == 0:
-            try:
-                data = json.loads(out)
-                permission = data.get("viewerPermission", "UNKNOWN")
-                print(f"  ✓ Repository permission: {permission}")
-                
-                if permission in ["ADMIN", "MAINTAIN", "WRITE"]:
-                    print("  ✓ Can create PRs and issues")
-                elif permission == "READ":
-                    self.warnings.append("Read-only access - cannot create PRs/issues")
-                    self.checks["can_create_pr"] = False
-                    self.checks["can_create_issue"] = False
-            except:
-                print("  ⚠ Could not determine permissions")
+        if repository:
+            permission = repository.get("viewerPermission") or "UNKNOWN"
+            print(f"  ✓ Repository permission: {permission}")
+            
+            if permission in ["ADMIN", "MAINTAIN", "WRITE"]:
+                print("  ✓ Can create PRs and issues")
+            elif permission == "READ":
+                self.warnings.append("Read-only access - cannot create PRs/issues")
+                self.checks["can_create_pr"] = False
+                self.checks["can_create_issue"] = False
         else:
             print("  ⚠ Could not check permissions")
     
@@ -233,13 +378,15 @@ class GitHubQuickstart:
         print("GitHub Reality Agent - Quickstart Validation")
         print("="*60)
         
-        # Run checks
-        git_ok = self.check_git()
-        gh_ok = self.check_github_cli()
+        # Run checks; git and gh probes don't depend on each other
+        results = self.probe({**GIT_PROBES, **GH_PROBES})
+        git_ok = self.check_git(results)
+        gh_ok = self.check_github_cli(results)
         
         if gh_ok:
             self.check_api_limits()
             self.check_permissions()
+        self._save_cache()
         
         # Estimate discovery
         levels = self.estimate_discovery()
@@ -250,7 +397,7 @@ class GitHubQuickstart:
         print("="*60)
         
         total_checks = len(self.checks)
-        passed_checks = sum(1 for v in self.checks.values() if v)
+        passed_checks = sum(self.checks.values())  # All checks are bools
         
         print(f"\n✓ Passed: {passed_checks}/{total_checks} checks")
         
@@ -281,7 +428,19 @@ class GitHubQuickstart:
 
 
 def main():
-    quickstart = GitHubQuickstart()
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="GitHub Reality Agent - Quickstart Validation"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-run every check instead of reusing recent results"
+    )
+    args = parser.parse_args()
+    
+    quickstart = GitHubQuickstart(use_cache=not args.no_cache)
     success = quickstart.run()
     
     # Suggest next steps
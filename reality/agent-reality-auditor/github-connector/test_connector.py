@@ -5,24 +5,62 @@ Tests progressive discovery and session management functions
 """
 
 import unittest
+import asyncio
+import contextlib
+import functools
 import json
 import tempfile
 import os
+import shutil
+import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent))
-from connector import GitHubRealityAgent
+
+# The module under test is imported by the first test class that runs, so
+# listing or filtering tests doesn't pay for it
+connector_module = None
+GitHubRealityAgent = None
+
+
+def _import_connector():
+    global connector_module, GitHubRealityAgent
+    if connector_module is None:
+        import connector as connector_module
+        GitHubRealityAgent = connector_module.GitHubRealityAgent
+
+# Looked up once at import, without going through a shell
+_GH_PATH = shutil.which("gh")
+
+
+@functools.lru_cache(maxsize=None)
+def _gh_authed() -> bool:
+    """Whether the real gh CLI is logged in; asked only by the test that needs it"""
+    return bool(_GH_PATH) and subprocess.run(
+        [_GH_PATH, "auth", "status"], capture_output=True
+    ).returncode == 0
 
 
 class TestGitHubRealityAgent(unittest.TestCase):
     """Test suite for GitHub Reality Agent"""
     
+    @classmethod
+    def setUpClass(cls):
+        _import_connector()
+    
     def setUp(self):
         """Set up test environment"""
+        connector_module._gh_identity_cache.clear()
         self.agent = GitHubRealityAgent(verbose=False)
+        self.agent._gh_token = ""  # No direct API access unless a test patches _api_request
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.agent.cache_dir = Path(cache_dir.name)
     
     def test_initialization(self):
         """Test agent initialization"""
@@ -45,14 +83,11 @@ class TestGitHubRealityAgent(unittest.TestCase):
     @patch('subprocess.run')
     def test_level_1_gh_not_installed(self, mock_run):
         """Test Level 1 when gh is not installed"""
-        mock_run.return_value = MagicMock(
-            returncode=127,
-            stdout="",
-            stderr="command not found"
-        )
+        mock_run.side_effect = FileNotFoundError(2, "No such file or directory", "gh")
         
         result = self.agent.level_1_github_cli_access()
         
+        mock_run.assert_called_once()
         self.assertEqual(result["level"], 1)
         self.assertEqual(result["confidence"], 0.0)
         self.assertFalse(result["gh_installed"])
@@ -61,10 +96,9 @@ class TestGitHubRealityAgent(unittest.TestCase):
     @patch('subprocess.run')
     def test_level_1_gh_installed_not_auth(self, mock_run):
         """Test Level 1 when gh is installed but not authenticated"""
-        # First call: gh --version
+        # gh auth status runs but reports no login
         mock_run.side_effect = [
-            MagicMock(returncode=0, stdout="gh version 2.46.0\n", stderr=""),
-            MagicMock(returncode=1, stdout="", stderr="Not authenticated")
+            MagicMock(returncode=1, stdout=b"", stderr=b"Not authenticated")
         ]
         
         result = self.agent.level_1_github_cli_access()
@@ -89,9 +123,8 @@ class TestGitHubRealityAgent(unittest.TestCase):
         })
         
         mock_run.side_effect = [
-            MagicMock(returncode=0, stdout="gh version 2.46.0\n", stderr=""),
-            MagicMock(returncode=0, stdout=auth_output, stderr=""),
-            MagicMock(returncode=0, stdout=rate_limit, stderr="")
+            MagicMock(returncode=0, stdout=auth_output.encode(), stderr=b""),
+            MagicMock(returncode=0, stdout=rate_limit.encode(), stderr=b"")
         ]
         
         result = self.agent.level_1_github_cli_access()
@@ -104,6 +137,101 @@ class TestGitHubRealityAgent(unittest.TestCase):
         self.assertIn("workflow", result["token_scopes"])
         self.assertIsNotNone(result["rate_limit"])
     
+    @patch('subprocess.run')
+    def test_level_1_identity_memoized(self, mock_run):
+        """Test gh auth status runs once per process, the rate limit every time"""
+        auth_output = "  - Token scopes: 'repo'"
+        rate_limit = json.dumps({"limit": 5000, "remaining": 4999})
+        mock_run.side_effect = [
+            MagicMock(returncode=0, stdout=auth_output.encode(), stderr=b""),
+            MagicMock(returncode=0, stdout=rate_limit.encode(), stderr=b""),
+            MagicMock(returncode=0, stdout=rate_limit.encode(), stderr=b"")
+        ]
+        
+        first = self.agent.level_1_github_cli_access()
+        other = GitHubRealityAgent(verbose=False)
+        other._gh_token = ""
+        second = other.level_1_github_cli_access()
+        
+        self.assertEqual(first, second)
+        self.assertEqual(second["confidence"], 1.0)
+        self.assertEqual([c.args[0][:3] for c in mock_run.call_args_list], [
+            ["gh", "auth", "status"], ["gh", "api", "rate_limit"], ["gh", "api", "rate_limit"]
+        ])
+        
+        # A different account is a different cache entry
+        mock_run.side_effect = [MagicMock(returncode=127, stdout=b"", stderr=b"command not found")]
+        with patch.dict(os.environ, {"GH_CONFIG_DIR": "/nonexistent"}):
+            self.assertFalse(GitHubRealityAgent(verbose=False).level_1_github_cli_access()["gh_installed"])
+    
+    @patch('subprocess.run')
+    def test_api_request_github_com_only(self, mock_run):
+        """Test the gh token is only requested for, and sent to, github.com"""
+        self.agent._gh_token = None
+        with patch.dict(os.environ, {"GH_HOST": "ghe.example.com"}):
+            self.assertIsNone(self.agent._api_request("GET", "/rate_limit"))
+        mock_run.assert_not_called()
+
+        mock_run.return_value = MagicMock(returncode=1, stdout=b"", stderr=b"not logged in to github.com")
+        with patch.dict(os.environ):
+            os.environ.pop("GH_HOST", None)
+            self.assertIsNone(self.agent._api_request("GET", "/rate_limit"))
+        self.assertEqual(mock_run.call_args.args[0], ["gh", "auth", "token", "--hostname", "github.com"])
+
+    def test_api_requests_run_concurrently(self):
+        """Test concurrent API requests each get their own connection"""
+        import http.client
+        both_in_flight = threading.Barrier(2, timeout=5)
+
+        class Connection:
+            def __init__(self, host, timeout):
+                pass
+            def request(self, method, path, body=None, headers=None):
+                both_in_flight.wait()  # Breaks if requests are serialized
+            def getresponse(self):
+                return MagicMock(status=200, read=lambda: b'{"ok": true}')
+
+        self.agent._gh_token = "token"
+        with patch.object(http.client, "HTTPSConnection", Connection), \
+             ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(lambda path: self.agent._api_request("GET", path), ["/a", "/b"]))
+
+        self.assertEqual(results, [{"ok": True}, {"ok": True}])
+        self.assertEqual(len(self.agent._http_idle), 2)
+
+    @patch('subprocess.run')
+    def test_level_1_rate_limit_over_rest(self, mock_run):
+        """Test Level 1 reads the rate limit from the REST API instead of gh api"""
+        mock_run.side_effect = [
+            MagicMock(returncode=0, stdout=b"github.com\n  - Logged in to github.com account testuser\n"
+                                           b"  - Token scopes: 'repo'", stderr=b"")
+        ]
+        rate = {"limit": 5000, "remaining": 4321, "reset": 1234567890, "used": 679}
+        
+        with patch.object(self.agent, '_api_request', return_value={"resources": {}, "rate": rate}) as mock_api:
+            result = self.agent.level_1_github_cli_access()
+        
+        mock_api.assert_called_once_with("GET", "/rate_limit")
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(result["rate_limit"], rate)
+    
+    @patch('subprocess.run')
+    def test_level_1_rate_limit_enterprise_via_gh(self, mock_run):
+        """Test Level 1 leaves an Enterprise-only login's rate limit to gh"""
+        rate = {"limit": 5000, "remaining": 4321}
+        mock_run.side_effect = [
+            MagicMock(returncode=0, stdout=b"ghe.example.com\n  - Logged in to ghe.example.com account testuser\n"
+                                           b"  - Token scopes: 'repo'", stderr=b""),
+            MagicMock(returncode=0, stdout=json.dumps(rate).encode(), stderr=b"")
+        ]
+        
+        with patch.object(self.agent, '_api_request') as mock_api:
+            result = self.agent.level_1_github_cli_access()
+        
+        mock_api.assert_not_called()
+        self.assertEqual(mock_run.call_args.args[0][:3], ["gh", "api", "rate_limit"])
+        self.assertEqual(result["rate_limit"], rate)
+    
     @patch('subprocess.run')
     def test_level_2_not_git_repo(self, mock_run):
         """Test Level 2 when not in a git repository"""
@@ -111,16 +239,18 @@ class TestGitHubRealityAgent(unittest.TestCase):
         
         mock_run.return_value = MagicMock(
             returncode=128,
-            stdout="",
-            stderr="not a git repository"
+            stdout=b"",
+            stderr=b"not a git repository"
         )
         
-        result = self.agent.level_2_repository_connection()
+        with patch.object(self.agent, '_fast_git_state', return_value=None):
+            result = self.agent.level_2_repository_connection()
         
         self.assertEqual(result["level"], 2)
         self.assertEqual(result["confidence"], 0.0)
         self.assertFalse(result["is_git_repo"])
         self.assertFalse(result["has_remote"])
+        self.assertFalse(self.agent.repo_connected)
     
     @patch('subprocess.run')
     def test_level_2_git_repo_with_remote(self, mock_run):
@@ -134,13 +264,14 @@ class TestGitHubRealityAgent(unittest.TestCase):
         })
         
         mock_run.side_effect = [
-            MagicMock(returncode=0, stdout="true", stderr=""),  # is git repo
-            MagicMock(returncode=0, stdout="https://github.com/owner/repo.git", stderr=""),  # remote URL
-            MagicMock(returncode=0, stdout="refs/remotes/origin/main", stderr=""),  # default branch
-            MagicMock(returncode=0, stdout=repo_info, stderr="")  # repo info
+            MagicMock(returncode=0, stdout=b"true", stderr=b""),  # is git repo
+            MagicMock(returncode=0, stdout=b"https://github.com/owner/repo.git", stderr=b""),  # remote URL
+            MagicMock(returncode=0, stdout=b"refs/remotes/origin/main", stderr=b""),  # default branch
+            MagicMock(returncode=0, stdout=repo_info.encode(), stderr=b"")  # repo info
         ]
         
-        result = self.agent.level_2_repository_connection()
+        with patch.object(self.agent, '_fast_git_state', return_value=None):
+            result = self.agent.level_2_repository_connection()
         
         self.assertEqual(result["level"], 2)
         self.assertGreater(result["confidence"], 0.5)
@@ -150,6 +281,213 @@ class TestGitHubRealityAgent(unittest.TestCase):
         self.assertEqual(result["repo_name"], "repo")
         self.assertEqual(result["default_branch"], "main")
         self.assertEqual(result["repo_visibility"], "public")
+        self.assertTrue(self.agent.repo_connected)
+    
+    def test_level_4_queries_run_concurrently(self):
+        """Test Level 4 issues its gh queries concurrently"""
+        self.agent.authenticated = True
+        self.agent.repo_connected = True
+        
+        open_issues = json.dumps([
+            {"number": 1, "assignees": [{"login": "testuser"}]},
+            {"number": 2, "assignees": []}
+        ])
+        outputs = {
+            ("issue", "list", "--limit"): open_issues,
+            ("issue", "list", "--assignee"): json.dumps([{"number": 1, "assignees": [{"login": "testuser"}]}]),
+            ("issue", "list", "--state"): "[]",
+            ("label", "list", "--limit"): json.dumps([{"name": "bug"}])
+        }
+        in_flight = []
+        max_in_flight = []
+        
+        async def fake_run(cmd):
+            in_flight.append(cmd)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(cmd)
+            return 0, outputs[tuple(cmd[1:4])], ""
+        
+        with patch.object(self.agent, 'run_command_async', side_effect=fake_run):
+            result = asyncio.run(self.agent.level_4_issue_tracking_state_async())
+        
+        self.assertEqual(max(max_in_flight), 4)
+        self.assertEqual(result["open_issues_count"], 2)
+        self.assertEqual([i["number"] for i in result["assigned_issues"]], [1])
+        self.assertEqual(len(result["labels"]), 1)
+    
+    def test_graphql_batches_level_3_and_4_lists(self):
+        """Test Levels 3 and 4 take their lists from one GraphQL query"""
+        self.agent.authenticated = True
+        self.agent.repo_connected = True
+        self.agent.repo_slug = "owner/repo"
+        
+        graphql = json.dumps({"data": {
+            "repository": {
+                "openPRs": {"nodes": [{"number": 7, "title": "PR", "state": "OPEN"}]},
+                "mergedPRs": {"nodes": []},
+                "openIssues": {"nodes": [
+                    {"number": 1, "assignees": {"nodes": [{"login": "testuser"}]}, "labels": {"nodes": []}},
+                    {"number": 2, "assignees": {"nodes": []}, "labels": {"nodes": [{"name": "bug"}]}}
+                ]},
+                "closedIssues": {"nodes": [{"number": 3}]},
+                "labels": {"nodes": [{"name": "bug"}]}
+            },
+            "assignedIssues": {"nodes": [
+                {"number": 1, "assignees": {"nodes": [{"login": "testuser"}]}, "labels": {"nodes": []}}
+            ]}
+        }})
+        commands = []
+        
+        async def fake_run(cmd):
+            commands.append(cmd[:3])
+            if cmd[1:3] == ["api", "graphql"]:
+                return 0, graphql, ""
+            return 1, "", "unexpected"
+        
+        async def discover_3_and_4():
+            self.agent._graphql_task = asyncio.ensure_future(self.agent._graphql_discover())
+            return await asyncio.gather(self.agent.level_3_pull_request_state_async(),
+                                        self.agent.level_4_issue_tracking_state_async())
+        
+        # No direct API access, so the query goes through `gh api graphql`
+        with patch.object(self.agent, 'run_command_async', side_effect=fake_run):
+            level_3, level_4 = asyncio.run(discover_3_and_4())
+        
+        # Only the GraphQL query plus the branch and PR status lookups
+        self.assertEqual(sorted(commands), sorted([
+            ["gh", "api", "graphql"], ["git", "branch", "--show-current"], ["gh", "pr", "status"]
+        ]))
+        self.assertEqual([pr["number"] for pr in level_3["open_prs"]], [7])
+        self.assertEqual(level_4["open_issues_count"], 2)
+        self.assertEqual([i["number"] for i in level_4["assigned_issues"]], [1])
+        self.assertEqual(level_4["open_issues"][1]["labels"], [{"name": "bug"}])
+        self.assertEqual(len(level_4["recent_closed_issues"]), 1)
+    
+    def test_level_5_uses_rest_api(self):
+        """Test Level 5 reads runs and workflows over the direct REST connection"""
+        self.agent.authenticated = True
+        self.agent.repo_connected = True
+        self.agent.repo_slug = "owner/repo"
+        
+        responses = {
+            "/repos/owner/repo/actions/runs?per_page=10": {"workflow_runs": [
+                {"id": 11, "name": "CI", "status": "in_progress", "conclusion": None,
+                 "created_at": "2024-01-01T00:00:00Z", "head_branch": "main"},
+                {"id": 12, "name": "CI", "status": "completed", "conclusion": "success",
+                 "created_at": "2024-01-01T00:00:00Z", "head_branch": "main"}
+            ]},
+            "/repos/owner/repo/actions/workflows?per_page=100": {"workflows": [
+                {"id": 5, "name": "CI", "state": "active", "path": ".github/workflows/ci.yml"}
+            ]}
+        }
+        
+        with tempfile.TemporaryDirectory() as repo:
+            workflows_dir = Path(repo) / ".github" / "workflows"
+            workflows_dir.mkdir(parents=True)
+            for name in ["ci.yml", "release.yaml", "README.md"]:
+                (workflows_dir / name).write_text("")
+            (workflows_dir / "old.yml").mkdir()
+            self.agent.repo_path = Path(repo)
+            
+            with patch.object(self.agent, '_api_request', side_effect=lambda method, path: responses[path]), \
+                 patch.object(self.agent, 'run_command_async') as mock_run:
+                result = self.agent.level_5_workflow_state()
+        
+        mock_run.assert_not_called()
+        self.assertEqual([run["databaseId"] for run in result["recent_runs"]], [11, 12])
+        self.assertEqual(result["recent_runs"][0]["headBranch"], "main")
+        self.assertEqual([run["databaseId"] for run in result["active_runs"]], [11])
+        self.assertEqual(result["workflows"], [{"name": "CI", "state": "active", "id": 5}])
+        self.assertEqual(sorted(result["workflow_files"]), ["ci.yml", "release.yaml"])
+        self.assertEqual(result["confidence"], 0.8)
+    
+    @patch('subprocess.run')
+    def test_level_2_repo_view_over_graphql(self, mock_run):
+        """Test Level 2 selects only the repository fields it uses over GraphQL"""
+        self.agent.authenticated = True
+        
+        mock_run.side_effect = [
+            MagicMock(returncode=0, stdout=b"true", stderr=b""),  # is git repo
+            MagicMock(returncode=0, stdout=b"git@github.com:owner/repo.git", stderr=b""),  # remote URL
+            MagicMock(returncode=0, stdout=b"refs/remotes/origin/main", stderr=b"")  # default branch
+        ]
+        repo = {"data": {"repository": {
+            "visibility": "PUBLIC",
+            "isFork": True,
+            "parent": {"nameWithOwner": "upstream/repo"}
+        }}}
+        
+        with patch.object(self.agent, '_api_request', return_value=repo) as mock_api, \
+             patch.object(self.agent, '_fast_git_state', return_value=None):
+            result = self.agent.level_2_repository_connection()
+        
+        method, path, payload = mock_api.call_args.args
+        self.assertEqual((method, path), ("POST", "/graphql"))
+        self.assertEqual(payload["variables"], {"owner": "owner", "name": "repo"})
+        self.assertEqual(mock_run.call_count, 3)
+        self.assertEqual(result["repo_visibility"], "PUBLIC")
+        self.assertTrue(result["is_fork"])
+        self.assertEqual(result["parent_repo"], "upstream/repo")
+        self.assertEqual(result["confidence"], 0.9)
+        self.assertEqual(self.agent.repo_slug, "owner/repo")
+    
+    @patch('subprocess.run')
+    def test_level_2_reads_git_state_from_disk(self, mock_run):
+        """Test Level 2 reads the remote and default branch from .git without running git"""
+        with tempfile.TemporaryDirectory() as repo:
+            git_dir = Path(repo) / ".git"
+            (git_dir / "refs" / "remotes" / "origin").mkdir(parents=True)
+            (git_dir / "config").write_text(
+                '[core]\n\tbare = false\n'
+                '[remote "origin"]\n'
+                '\turl = https://github.com/owner/repo.git\n'
+                '\tfetch = +refs/heads/*:refs/remotes/origin/*\n'
+                '\tfetch = +refs/pull/*:refs/remotes/origin/pr/*\n'
+            )
+            (git_dir / "refs" / "remotes" / "origin" / "HEAD").write_text("ref: refs/remotes/origin/main\n")
+            subdir = Path(repo) / "src"
+            subdir.mkdir()
+            
+            agent = GitHubRealityAgent(str(subdir))
+            agent.authenticated = True
+            agent._gh_token = ""
+            mock_run.return_value = MagicMock(returncode=1, stdout=b"", stderr=b"no repo view")
+            with patch.dict(os.environ, {"HOME": repo, "XDG_CONFIG_HOME": repo}):
+                result = agent.level_2_repository_connection()
+        
+        self.assertTrue(result["is_git_repo"])
+        self.assertEqual(result["remote_url"], "https://github.com/owner/repo.git")
+        self.assertEqual(result["repo_owner"], "owner")
+        self.assertEqual(result["repo_name"], "repo")
+        self.assertEqual(result["default_branch"], "main")
+        # Only `gh repo view` ran; no git commands
+        self.assertEqual([c.args[0][0] for c in mock_run.call_args_list], ["gh"])
+
+    def test_fast_git_state_defers_to_git(self):
+        """Test the .git reader leaves config and discovery it cannot model to git"""
+        with tempfile.TemporaryDirectory() as repo:
+            git_dir = Path(repo) / ".git"
+            git_dir.mkdir()
+            (git_dir / "config").write_text('[remote "origin"]\n\turl = https://github.com/owner/repo.git\n')
+            agent = GitHubRealityAgent(repo)
+            env = {"HOME": repo, "XDG_CONFIG_HOME": repo}
+
+            with patch.dict(os.environ, env):
+                self.assertEqual(agent._fast_git_state(), (True, "https://github.com/owner/repo.git", None))
+            with patch.dict(os.environ, dict(env, GIT_CEILING_DIRECTORIES=repo)):
+                self.assertIsNone(agent._fast_git_state())
+            with patch.dict(os.environ, dict(env, GIT_CONFIG_GLOBAL="/dev/null")):
+                self.assertIsNone(agent._fast_git_state())
+
+            (Path(repo) / ".gitconfig").write_text('[includeIf "gitdir:~/work/"]\n\tpath = work.gitconfig\n')
+            with patch.dict(os.environ, env):
+                self.assertIsNone(agent._fast_git_state())
+
+            (Path(repo) / ".gitconfig").unlink()
+            (git_dir / "commondir").write_text("../..\n")
+            with patch.dict(os.environ, env):
+                self.assertIsNone(agent._fast_git_state())
     
     def test_session_branch_creation(self):
         """Test session branch name generation"""
@@ -168,8 +506,8 @@ class TestGitHubRealityAgent(unittest.TestCase):
         pr_url = "https://github.com/owner/repo/pull/123"
         mock_run.return_value = MagicMock(
             returncode=0,
-            stdout=pr_url,
-            stderr=""
+            stdout=pr_url.encode(),
+            stderr=b""
         )
         
         result = self.agent.create_pull_request(
@@ -191,8 +529,8 @@ class TestGitHubRealityAgent(unittest.TestCase):
         issue_url = "https://github.com/owner/repo/issues/456"
         mock_run.return_value = MagicMock(
             returncode=0,
-            stdout=issue_url,
-            stderr=""
+            stdout=issue_url.encode(),
+            stderr=b""
         )
         
         result = self.agent.create_issue(
@@ -225,40 +563,27 @@ class TestGitHubRealityAgent(unittest.TestCase):
     
     def test_discovery_authenticated(self):
         """Test full discovery when authenticated"""
-        with patch.object(self.agent, 'level_1_github_cli_access') as mock_level1, \
-             patch.object(self.agent, 'level_2_repository_connection') as mock_level2, \
-             patch.object(self.agent, 'level_3_pull_request_state') as mock_level3, \
-             patch.object(self.agent, 'level_4_issue_tracking_state') as mock_level4, \
-             patch.object(self.agent, 'level_5_workflow_state') as mock_level5:
-            
-            # Mock return values that also set confidence scores
-            def mock_l1():
-                self.agent.confidence_scores[1] = 1.0
-                self.agent.authenticated = True
-                return {"level": 1, "confidence": 1.0, "authenticated": True}
-            
-            def mock_l2():
-                self.agent.confidence_scores[2] = 0.9
-                self.agent.repo_info = {"test": "data"}
-                return {"level": 2, "confidence": 0.9}
-            
-            def mock_l3():
-                self.agent.confidence_scores[3] = 0.8
-                return {"level": 3, "confidence": 0.8}
-            
-            def mock_l4():
-                self.agent.confidence_scores[4] = 0.7
-                return {"level": 4, "confidence": 0.7}
-            
-            def mock_l5():
-                self.agent.confidence_scores[5] = 0.6
-                return {"level": 5, "confidence": 0.6}
-            
-            mock_level1.side_effect = mock_l1
-            mock_level2.side_effect = mock_l2
-            mock_level3.side_effect = mock_l3
-            mock_level4.side_effect = mock_l4
-            mock_level5.side_effect = mock_l5
+        # (level method, confidence, agent state the level establishes)
+        levels = {
+            1: ("level_1_github_cli_access", 1.0, {"authenticated": True}),
+            2: ("level_2_repository_connection", 0.9, {"repo_info": {"test": "data"}, "repo_connected": True}),
+            3: ("level_3_pull_request_state_async", 0.8, {}),
+            4: ("level_4_issue_tracking_state_async", 0.7, {}),
+            5: ("level_5_workflow_state_async", 0.6, {})
+        }
+        
+        def level_mock(level, confidence, state):
+            def run():
+                self.agent.confidence_scores[level] = confidence
+                for name, value in state.items():
+                    setattr(self.agent, name, value)
+                return {"level": level, "confidence": confidence}
+            return run
+        
+        with contextlib.ExitStack() as stack:
+            for level, (method, confidence, state) in levels.items():
+                stack.enter_context(patch.object(
+                    self.agent, method, side_effect=level_mock(level, confidence, state)))
             
             result = self.agent.discover(max_level=5)
             
@@ -266,6 +591,114 @@ class TestGitHubRealityAgent(unittest.TestCase):
             self.assertEqual(len(result["levels"]), 5)
             self.assertAlmostEqual(result["overall_confidence"], 0.8, places=1)
     
+    def test_discovery_cache(self):
+        """Test levels 2-5 of a completed discovery are reused until HEAD changes, behind a fresh Level 1"""
+        calls = {1: 0, 2: 0}
+        
+        def authenticated():
+            calls[1] += 1
+            self.agent.authenticated = True
+            self.agent.confidence_scores[1] = 1.0
+            return {"level": 1, "confidence": 1.0, "gh_installed": True, "authenticated": True,
+                    "auth_status": "Logged in to github.com account testuser\n  - Token: gho_****"}
+        
+        def repository():
+            calls[2] += 1
+            self.agent.confidence_scores[2] = 0.9
+            self.agent.repo_connected = True
+            self.agent.repo_slug = "owner/repo"
+            self.agent.repo_info = {"visibility": "PUBLIC", "isFork": False}
+            return {"level": 2, "confidence": 0.9, "is_git_repo": True}
+        
+        head = ["0" * 40 + "\nmain\n"]
+        
+        async def fake_run(cmd):
+            return 0, head[0], ""
+        
+        with patch.object(self.agent, 'level_1_github_cli_access', side_effect=authenticated), \
+             patch.object(self.agent, 'level_2_repository_connection', side_effect=repository), \
+             patch.object(self.agent, 'run_command_async', side_effect=fake_run):
+            first = self.agent.discover(max_level=2)
+            self.agent.repo_connected, self.agent.repo_slug, self.agent.repo_info = False, None, {}
+            second = self.agent.discover(max_level=2)
+            self.assertEqual(calls, {1: 2, 2: 1})
+            self.assertTrue(second["from_cache"])
+            self.assertEqual(second["levels"], first["levels"])  # Integer level keys restored
+            self.assertAlmostEqual(second["overall_confidence"], 0.95)
+            self.assertNotIn("repo_state", second)
+            # A hit leaves the agent connected, as Level 2 itself would
+            self.assertTrue(self.agent.repo_connected)
+            self.assertEqual(self.agent.repo_slug, "owner/repo")
+            self.assertEqual(self.agent.repo_info, {"visibility": "PUBLIC", "isFork": False})
+            
+            # Auth output never reaches the disk
+            for cache_file in self.agent.cache_dir.iterdir():
+                self.assertNotIn("gho_", cache_file.read_text())
+            
+            self.agent.discover(max_level=2, use_cache=False)
+            self.assertEqual(calls[2], 2)
+            
+            head[0] = "1" * 40 + "\nmain\n"  # New commit
+            self.assertNotIn("from_cache", self.agent.discover(max_level=2))
+            self.assertEqual(calls[2], 3)
+    
+    def test_discovery_inside_running_loop(self):
+        """Test discover() still works when called from code already running an event loop"""
+        def not_installed():
+            return {"level": 1, "confidence": 0.0, "gh_installed": False, "authenticated": False}
+        
+        async def caller():
+            return self.agent.discover(max_level=5)
+        
+        with patch.object(self.agent, 'level_1_github_cli_access', side_effect=not_installed):
+            result = asyncio.run(caller())
+        
+        self.assertIn(1, result["levels"])
+        self.assertFalse(result["discovery_complete"])
+    
+    def test_discover_async_keeps_loop_free(self):
+        """Test discover_async runs the blocking Levels 1-2 off the event loop thread"""
+        threads = {}
+
+        def authenticated():
+            threads[1] = threading.get_ident()
+            self.agent.authenticated = True
+            return {"level": 1, "confidence": 1.0, "gh_installed": True, "authenticated": True}
+
+        def repository():
+            threads[2] = threading.get_ident()
+            return {"level": 2, "confidence": 0.3, "is_git_repo": True}
+
+        async def caller():
+            threads["loop"] = threading.get_ident()
+            return await self.agent.discover_async(max_level=2, use_cache=False)
+
+        with patch.object(self.agent, 'level_1_github_cli_access', side_effect=authenticated), \
+             patch.object(self.agent, 'level_2_repository_connection', side_effect=repository):
+            result = asyncio.run(caller())
+
+        self.assertTrue(result["discovery_complete"])
+        self.assertNotIn(threads["loop"], (threads[1], threads[2]))
+
+    def test_safe_json(self):
+        """Test gh output parsing tolerates empty and malformed output"""
+        self.assertEqual(connector_module._safe_json('  [{"number": 1}]\n'), [{"number": 1}])
+        self.assertEqual(connector_module._safe_json('{"limit": 5000}'), {"limit": 5000})
+        self.assertIsNone(connector_module._safe_json(""))
+        self.assertIsNone(connector_module._safe_json("API rate limit exceeded"))
+        self.assertIsNone(connector_module._safe_json('{"truncated": '))
+
+    def test_remote_url_parsing(self):
+        """Test owner and repo are read from HTTPS and SSH remotes"""
+        for url in ["https://github.com/owner/repo.git", "https://github.com/owner/repo",
+                    "git@github.com:owner/repo.git", "ssh://git@github.com/owner/repo.git/",
+                    "https://github.com/owner/repo/\n"]:
+            match = connector_module._GH_URL_RE.search(url)
+            self.assertEqual(match.groups(), ("owner", "repo"), url)
+        self.assertEqual(connector_module._GH_URL_RE.search("https://github.com/owner/my.gitops").group(2),
+                         "my.gitops")
+        self.assertIsNone(connector_module._GH_URL_RE.search("https://gitlab.com/owner/repo.git"))
+
     def test_error_handling(self):
         """Test error handling in commands"""
         with patch('subprocess.run') as mock_run:
@@ -277,14 +710,25 @@ class TestGitHubRealityAgent(unittest.TestCase):
             self.assertEqual(stdout, "")
             self.assertIn("Test exception", stderr)
 
+    @patch('subprocess.run')
+    def test_run_command_invalid_utf8(self, mock_run):
+        """Test undecodable output doesn't turn a successful command into a failure"""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b"caf\xe9 \xe2\x9c\x93\n", stderr=b"")
+
+        returncode, stdout, stderr = self.agent.run_command(["gh", "issue", "list"])
+
+        self.assertEqual(returncode, 0)
+        self.assertEqual(stdout, "caf� ✓\n")
+
 
 class TestIntegration(unittest.TestCase):
     """Integration tests (requires actual GitHub CLI)"""
     
-    @unittest.skipUnless(
-        os.system("which gh > /dev/null 2>&1") == 0,
-        "GitHub CLI not installed"
-    )
+    @classmethod
+    def setUpClass(cls):
+        _import_connector()
+    
+    @unittest.skipUnless(_GH_PATH, "GitHub CLI not installed")
     def test_real_gh_version(self):
         """Test with real GitHub CLI"""
         agent = GitHubRealityAgent(verbose=False)
@@ -293,12 +737,10 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(returncode, 0)
         self.assertIn("gh version", stdout)
     
-    @unittest.skipUnless(
-        os.system("gh auth status > /dev/null 2>&1") == 0,
-        "Not authenticated to GitHub"
-    )
     def test_real_auth_status(self):
         """Test real authentication status"""
+        if not _gh_authed():
+            self.skipTest("Not authenticated to GitHub")
         agent = GitHubRealityAgent(verbose=False)
         result = agent.level_1_github_cli_access()
         